@@ -0,0 +1,293 @@
+import argparse
+import asyncio
+import json
+import platform
+import random
+import subprocess
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import httpx
+
+from database.conection import get_client, get_settings, use_client
+from models.hobby import Discussion, Hobby, Topic
+from models.users import User
+from service.hashing import pwd_context
+
+
+settings = get_settings()
+
+PASSWORD = "bench-password"
+DEFAULT_MIX = "signup=5,signin=10,hobby_list=25,hobby_get=35,comment_create=15,comment_edit=10"
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        weights[name.strip()] = float(weight)
+    unknown = set(weights) - set(OPERATIONS)
+    if unknown:
+        raise SystemExit(f"Unknown operations in --mix: {', '.join(sorted(unknown))}")
+    return weights
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(pct / 100 * len(sorted_values))) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def boot(args):
+    if args.backend == "mongomock":
+        from benchmarks.standin import mongomock_client
+        use_client(mongomock_client())
+    else:
+        settings.DATABASE_URL = args.mongo_url
+    settings.DATABASE_NAME = args.database
+    client = get_client(settings)
+    await client.drop_database(args.database)
+
+    from main import create_app
+    return create_app()
+
+
+async def seed(args, rng: random.Random) -> dict:
+    hashed = pwd_context.hash(PASSWORD)
+    users = [User(email=f"user{i}@bench.example", password=hashed, name=f"User {i}") for i in range(args.users)]
+    hobbies = [Hobby(name=f"hobby-{i}", description=f"Hobby number {i}", owner=users[i % len(users)].email) for i in range(args.hobbies)]
+    topics = [
+        Topic(name=f"topic-{j}", description=f"Topic {j} of {hobby.name}", hobby_name=hobby.name, owner=users[j % len(users)].email)
+        for hobby in hobbies
+        for j in range(args.topics_per_hobby)
+    ]
+    started = datetime.now() - timedelta(days=30)
+    comments = []
+    for topic in topics:
+        thread = [
+            Discussion(
+                comment=f"Seed comment {k} on {topic.hobby_name}/{topic.name}",
+                topic_name=topic.name,
+                hobby_name=topic.hobby_name,
+                owner=users[rng.randrange(len(users))].email,
+                created_at=started + timedelta(seconds=rng.randrange(30 * 24 * 3600)),
+            )
+            for k in range(args.comments_per_topic)
+        ]
+        topic.comment_count = len(thread)
+        topic.last_activity_at = max((comment.created_at for comment in thread), default=None)
+        comments.extend(thread)
+    for hobby in hobbies:
+        owned = [topic for topic in topics if topic.hobby_name == hobby.name]
+        hobby.topic_count = len(owned)
+        hobby.comment_count = sum(topic.comment_count for topic in owned)
+        hobby.last_activity_at = max((topic.last_activity_at for topic in owned if topic.last_activity_at), default=None)
+    for model, documents in ((User, users), (Hobby, hobbies), (Topic, topics), (Discussion, comments)):
+        for start in range(0, len(documents), 1000):
+            await model.insert_many(documents[start:start + 1000])
+    return {
+        "users": [user.email for user in users],
+        "topics": [(topic.hobby_name, topic.name) for topic in topics],
+    }
+
+
+class Workload:
+    def __init__(self, client: httpx.AsyncClient, data: dict, rng: random.Random, run_id: str):
+        self.client = client
+        self.data = data
+        self.rng = rng
+        self.run_id = run_id
+        self.tokens: List[str] = []
+        self.comments: List[tuple] = []
+        self.signups = 0
+
+    async def sign_in(self, email: str) -> httpx.Response:
+        return await self.client.post("/user/signin", data={"username": email, "password": PASSWORD})
+
+    async def prepare(self, sessions: int):
+        for email in self.rng.sample(self.data["users"], min(sessions, len(self.data["users"]))):
+            response = await self.sign_in(email)
+            response.raise_for_status()
+            self.tokens.append(response.json()["access_token"])
+
+    def auth(self) -> dict:
+        return {"Authorization": f"Bearer {self.rng.choice(self.tokens)}"}
+
+    async def signup(self) -> httpx.Response:
+        self.signups += 1
+        email = f"new-{self.run_id}-{self.signups}@bench.example"
+        return await self.client.post("/user/signup", json={"email": email, "password": PASSWORD})
+
+    async def signin(self) -> httpx.Response:
+        return await self.sign_in(self.rng.choice(self.data["users"]))
+
+    async def hobby_list(self) -> httpx.Response:
+        return await self.client.get("/hobby/all", params={"limit": 50})
+
+    async def hobby_get(self) -> httpx.Response:
+        hobby_name, _ = self.rng.choice(self.data["topics"])
+        return await self.client.get(f"/hobby/{hobby_name}")
+
+    async def comment_create(self) -> httpx.Response:
+        hobby_name, topic_name = self.rng.choice(self.data["topics"])
+        headers = self.auth()
+        response = await self.client.post(
+            f"/hobby/{hobby_name}/{topic_name}/comment",
+            json={"comment": "Load test comment", "topic_name": topic_name},
+            headers=headers,
+        )
+        if response.status_code == 200:
+            self.comments.append((hobby_name, topic_name, response.json()["_id"], headers))
+        return response
+
+    async def comment_edit(self) -> httpx.Response:
+        if not self.comments:
+            return await self.comment_create()
+        hobby_name, topic_name, comment_id, headers = self.rng.choice(self.comments)
+        return await self.client.put(
+            f"/hobby/{hobby_name}/{topic_name}/comment/{comment_id}",
+            json={"comment": "Edited load test comment", "topic_name": topic_name},
+            headers=headers,
+        )
+
+
+OPERATIONS = {
+    "signup": Workload.signup,
+    "signin": Workload.signin,
+    "hobby_list": Workload.hobby_list,
+    "hobby_get": Workload.hobby_get,
+    "comment_create": Workload.comment_create,
+    "comment_edit": Workload.comment_edit,
+}
+
+
+async def run(workload: Workload, schedule: List[str], concurrency: int) -> tuple:
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    queue = iter(schedule)
+
+    async def worker():
+        for name in queue:
+            started = time.perf_counter()
+            try:
+                response = await OPERATIONS[name](workload)
+                failed = response.status_code >= 400
+            except Exception:
+                failed = True
+            latencies[name].append(time.perf_counter() - started)
+            if failed:
+                errors[name] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - started
+
+
+def build_report(args, latencies: dict, errors: dict, elapsed: float) -> dict:
+    routes = {}
+    for name in sorted(latencies):
+        values = sorted(latencies[name])
+        routes[name] = {
+            "count": len(values),
+            "errors": errors.get(name, 0),
+            "throughput_rps": len(values) / elapsed,
+            "p50_ms": percentile(values, 50) * 1000,
+            "p95_ms": percentile(values, 95) * 1000,
+            "p99_ms": percentile(values, 99) * 1000,
+        }
+    everything = sorted(value for values in latencies.values() for value in values)
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        "elapsed_s": elapsed,
+        "total": {
+            "count": len(everything),
+            "errors": sum(errors.values()),
+            "throughput_rps": len(everything) / elapsed,
+            "p50_ms": percentile(everything, 50) * 1000,
+            "p95_ms": percentile(everything, 95) * 1000,
+            "p99_ms": percentile(everything, 99) * 1000,
+        },
+        "routes": routes,
+    }
+
+
+def print_report(report: dict, baseline: Optional[dict] = None):
+    header = f"{'route':<16}{'count':>8}{'errors':>8}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    print(f"commit {report['commit']}  elapsed {report['elapsed_s']:.2f}s")
+    print(header)
+    rows = list(report["routes"].items()) + [("TOTAL", report["total"])]
+    for name, row in rows:
+        print(f"{name:<16}{row['count']:>8}{row['errors']:>8}{row['throughput_rps']:>10.1f}{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}{row['p99_ms']:>10.2f}")
+        if baseline:
+            base = baseline["total"] if name == "TOTAL" else baseline["routes"].get(name)
+            if base:
+                deltas = [
+                    f"{key} {(row[key] - base[key]) / base[key] * 100:+.1f}%"
+                    for key in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms")
+                    if base[key]
+                ]
+                print(f"{'':<16}vs {baseline.get('commit')}: " + ", ".join(deltas))
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Replay a mixed read/write workload against the app and report per-route latency.")
+    parser.add_argument("--backend", choices=["mongomock", "mongod"], default="mongod")
+    parser.add_argument("--mongo-url", default="mongodb://localhost:27017")
+    parser.add_argument("--database", default="hobbies_bench")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--hobbies", type=int, default=100)
+    parser.add_argument("--topics-per-hobby", type=int, default=20)
+    parser.add_argument("--comments-per-topic", type=int, default=50)
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--compare", help="baseline JSON report to diff against")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    if args.backend == "mongomock":
+        from benchmarks.standin import UNSUPPORTED_OPERATIONS
+        skipped = sorted(UNSUPPORTED_OPERATIONS & set(mix))
+        if skipped:
+            print(f"Skipping {', '.join(skipped)}: not supported by the mongomock backend, use --backend mongod")
+            mix = {name: weight for name, weight in mix.items() if name not in UNSUPPORTED_OPERATIONS}
+    rng = random.Random(args.seed)
+    app = await boot(args)
+    async with app.router.lifespan_context(app):
+        data = await seed(args, rng)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            workload = Workload(client, data, rng, run_id=str(args.seed))
+            await workload.prepare(args.sessions)
+            schedule = rng.choices(list(mix), weights=list(mix.values()), k=args.requests)
+            latencies, errors, elapsed = await run(workload, schedule, args.concurrency)
+
+    report = build_report(args, latencies, errors, elapsed)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,82 @@
+import argparse
+import asyncio
+import json
+import time
+from typing import List
+
+from beanie import init_beanie
+from bson import ObjectId
+from pydantic import TypeAdapter
+
+from database.serialization import dumps, projection_for
+from models.common import Page
+from models.users import Role, User, UserOut
+
+
+async def init_models():
+    try:
+        from mongomock_motor import AsyncMongoMockClient
+        client = AsyncMongoMockClient()
+    except ImportError:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        client = AsyncIOMotorClient("mongodb://localhost:27017", serverSelectionTimeoutMS=2000)
+    await init_beanie(database=client["serialization_bench"], document_models=[User])
+
+
+def make_raw_users(count: int) -> List[dict]:
+    return [
+        {
+            "_id": ObjectId(),
+            "email": f"user{i}@example.com",
+            "password": "$2b$12$" + "x" * 53,
+            "name": f"User {i}",
+            "hobby": ["hiking", "chess", "climbing"],
+            "role": Role.user.value,
+            "moderated_hobbies": [],
+        }
+        for i in range(count)
+    ]
+
+
+def document_path(raw_docs: List[dict]) -> bytes:
+    docs = [User.model_validate(raw) for raw in raw_docs]
+    adapter = TypeAdapter(Page[User])
+    content = {"items": [doc.model_dump(by_alias=True) for doc in docs], "next_cursor": None}
+    value = adapter.validate_python(content)
+    return json.dumps(adapter.dump_python(value, mode="json", by_alias=True), ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def lean_path(raw_docs: List[dict]) -> bytes:
+    fields = projection_for(UserOut)
+    items = [{key: value for key, value in raw.items() if key in fields or key == "_id"} for raw in raw_docs]
+    return dumps({"items": items, "next_cursor": None})
+
+
+def measure(fn, raw_docs: List[dict], repeat: int) -> dict:
+    best = float("inf")
+    body = b""
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = fn(raw_docs)
+        best = min(best, time.perf_counter() - started)
+    return {"us_per_item": best / len(raw_docs) * 1e6, "bytes_per_item": len(body) / len(raw_docs)}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Compare per-item cost of Document responses against lean projections.")
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    await init_models()
+    raw_docs = make_raw_users(args.items)
+    results = {
+        "document+response_model": measure(document_path, raw_docs, args.repeat),
+        "projection+orjson": measure(lean_path, raw_docs, args.repeat),
+    }
+    for name, result in results.items():
+        print(f"{name:<26} {result['us_per_item']:8.2f} us/item {result['bytes_per_item']:8.1f} bytes/item")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,21 @@
+from mongomock_motor import AsyncMongoMockClient, AsyncMongoMockCollection
+
+
+# mongomock has no $lookup with a sub-pipeline, which GET /hobby/{name} relies on.
+UNSUPPORTED_OPERATIONS = {"hobby_get"}
+
+
+class StandInClient(AsyncMongoMockClient):
+    def get_default_database(self, default=None, **kwargs):
+        return self.get_database(default, **kwargs)
+
+
+def _with_options(collection, **options):
+    return collection
+
+
+def mongomock_client() -> StandInClient:
+    # A single in-memory node has no replicas to route reads to, so the read
+    # preference is ignored rather than unwrapping the collection.
+    AsyncMongoMockCollection.with_options = _with_options
+    return StandInClient()
@@ -1,148 +1,497 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional
+from beanie import PydanticObjectId
 from fastapi import Depends, HTTPException, status
+from pymongo import ReadPreference
+from pymongo.errors import DuplicateKeyError, PyMongoError
 from data.users import get_current_user
-from models.hobby import Discussion, DiscussionCreate, Hobby, HobbyCreate, Topic, TopicCreate
+from database.conection import Database, bulk_result, check_bulk_size, tombstone
+from database.pagination import DEFAULT_PAGE_SIZE, keyset_filter, merge_filters, next_cursor_for
+from models.hobby import CommentOut, Discussion, DiscussionArchive, DiscussionCreate, Hobby, HobbyCreate, HobbyDetail, HobbyOut, Topic, TopicCreate
 from models.users import Role, User
+from service.broker import create_broker, hobby_channel, topic_channel
+from service.archive import DiscussionArchiver
+from service.batching import GroupCommit
+from service.cache import ReadThroughCache
+from service.counters import CounterReconciler
+from service.deletion import CascadeDeleter
+from service.etags import EPOCH, VersionStore
+from service.search import create_search_index
+from service.singleflight import SingleFlight
+from service.trending import TrendingCounters
+from service.users import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+hobby_database = Database(Hobby)
+topic_database = Database(Topic)
+discussion_database = Database(Discussion)
+versioned_hobbies = Database(Hobby, ReadPreference.PRIMARY)
+hobby_cache = ReadThroughCache(Hobby, settings.LOOKUP_CACHE_SIZE, settings.LOOKUP_CACHE_TTL, settings.LOOKUP_NEGATIVE_TTL)
+topic_cache = ReadThroughCache(Topic, settings.LOOKUP_CACHE_SIZE, settings.LOOKUP_CACHE_TTL, settings.LOOKUP_NEGATIVE_TTL)
+broker = create_broker(settings.BROKER_BACKEND, settings.BROKER_QUEUE_SIZE)
+search_index = create_search_index(settings.SEARCH_BACKEND)
+hobby_flight = SingleFlight(settings.SINGLE_FLIGHT_MAX_WAITERS)
+hobby_list_flight = SingleFlight(settings.SINGLE_FLIGHT_MAX_WAITERS)
+trending = TrendingCounters(settings.TRENDING_WINDOW, settings.TRENDING_BUCKET, settings.TRENDING_TOP_K, settings.TRENDING_MAX_KEYS, settings.TRENDING_SYNC_INTERVAL)
+versions = VersionStore(broker, settings.VERSION_CACHE_TTL, settings.LOOKUP_CACHE_SIZE, settings.VERSION_COALESCE_INTERVAL)
+LIVE = {"deleted_at": None}
+HOBBIES_VERSION = "hobbies"
+
+
+def forget_removed(kind: str, ids: list):
+    for id in ids:
+        search_index.remove(kind, id)
+
+archiver = DiscussionArchiver(
+    timedelta(days=settings.ARCHIVE_AFTER_DAYS), timedelta(days=settings.ARCHIVE_INACTIVE_DAYS),
+    settings.ARCHIVE_BUCKET_SIZE, settings.ARCHIVE_BATCH_PAUSE, settings.ARCHIVE_INTERVAL, on_archived=forget_removed,
+)
+deleter = CascadeDeleter(settings.DELETE_BATCH_SIZE, settings.DELETE_BATCH_PAUSE, settings.DELETE_LEASE_SECONDS, settings.DELETE_POLL_INTERVAL, forget_removed)
+COMMENT_FIELDS = set(CommentOut.model_fields)
+
+
+def topic_key(hobby_name: str, topic_name: str) -> str:
+    return f"{hobby_name}\x1f{topic_name}"
+
+def record_activity(hobby_name: str, topic_name: Optional[str] = None, amount: int = 1):
+    trending.record("hobby", hobby_name, amount)
+    if topic_name is not None:
+        trending.record("topic", topic_key(hobby_name, topic_name), amount)
+
+def trending_items(kind: str, limit: int) -> List[dict]:
+    items = []
+    for key, score in trending.top(kind, limit):
+        if kind == "topic":
+            hobby_name, _, topic_name = key.partition("\x1f")
+            items.append({"hobby_name": hobby_name, "topic_name": topic_name, "score": score})
+        else:
+            items.append({"hobby_name": key, "score": score})
+    return items
+
+def hobby_version(hobby_name: str) -> str:
+    return f"hobby:{hobby_name}"
+
+async def find_hobby(hobby_name: str) -> Optional[Hobby]:
+    return await hobby_cache.get(hobby_name, lambda: Hobby.find_one({"name": hobby_name, **LIVE}))
+
+async def find_topic(hobby_name: str, topic_name: str) -> Optional[Topic]:
+    if not await find_hobby(hobby_name):
+        return None
+    return await topic_cache.get(topic_key(hobby_name, topic_name), lambda: Topic.find_one({"hobby_name": hobby_name, "name": topic_name, **LIVE}))
+
 
 async def create_hobby(hobby: HobbyCreate, current_user: User):
-    existing_hobby = await Hobby.find_one(Hobby.name == hobby.name)
+    existing_hobby = await find_hobby(hobby.name)
     if existing_hobby:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Hobby already exists")
     new_hobby = Hobby(**hobby.model_dump(), owner=current_user.email)
-    await new_hobby.insert()
+    try:
+        await new_hobby.insert()
+    except DuplicateKeyError:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Hobby already exists")
+    await hobby_cache.put(new_hobby.name, new_hobby)
+    search_index.add("hobby", new_hobby)
+    await versions.bump(HOBBIES_VERSION)
     return new_hobby
 
-async def list_hobbies():
-    hobbies = await Hobby.find_all().to_list()
-    return hobbies
+async def list_hobbies(cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE):
+    return await hobby_list_flight.do((cursor, limit), lambda: versioned_hobbies.get_page(LIVE, cursor=cursor, limit=limit, projection_model=HobbyOut))
 
-async def get_hobby(hobby_name: str):
-    hobby = await Hobby.find_one(Hobby.name == hobby_name)
-    if not hobby:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Hobby not found")
-    topics = await Topic.find(Topic.hobby_id == hobby_name).to_list()
-    return {"hobby": hobby, "topics": topics}
+def stream_hobbies():
+    return hobby_database.stream(LIVE, projection_model=HobbyOut)
 
+def hobby_detail_pipeline(hobby_name: str, topic_cursor: Optional[str], topic_limit: int) -> list:
+    topics_pipeline = [
+        {"$match": merge_filters(LIVE, keyset_filter(topic_cursor))},
+        {"$sort": {"_id": 1}},
+        {"$limit": topic_limit + 1},
+        {"$project": {"name": 1, "description": 1, "owner": 1, "comment_count": 1, "last_activity_at": 1}},
+    ]
+    return [
+        {"$match": {"name": hobby_name, **LIVE}},
+        {"$limit": 1},
+        {"$lookup": {
+            "from": Topic.get_collection_name(),
+            "localField": "name",
+            "foreignField": "hobby_name",
+            "pipeline": topics_pipeline,
+            "as": "topics",
+        }},
+        {"$project": {"name": 1, "description": 1, "owner": 1, "version": 1, "topic_count": 1, "comment_count": 1, "last_activity_at": 1, "topics": 1}},
+    ]
 
-async def delete_hobby(hobby_name: str, current_user: User = Depends(get_current_user)):
-    existing_hobby = await Hobby.find_one(Hobby.name == hobby_name)
-    
-    if not existing_hobby:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Hobby not found")
-    
-    if current_user.role == Role.admin or (current_user.role == Role.moderator and hobby_name in current_user.moderated_hobbies):
-        await existing_hobby.delete()
-        return {"message": "Hobby deleted successfully"}
-    else:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions to delete the hobby")
+async def load_hobby(hobby_name: str, topic_cursor: Optional[str], topic_limit: int) -> Optional[HobbyDetail]:
+    docs = await versioned_hobbies.read_collection().aggregate(hobby_detail_pipeline(hobby_name, topic_cursor, topic_limit)).to_list(None)
+    if not docs:
+        return None
+    detail = docs[0]
+    if len(detail["topics"]) > topic_limit:
+        detail["topics"] = detail["topics"][:topic_limit]
+        detail["next_topic_cursor"] = next_cursor_for(detail["topics"][-1])
+    return HobbyDetail.model_validate(detail)
 
-async def edit_hobby(hobby_name: str, hobby: HobbyCreate, current_user: User = Depends(get_current_user)):
-    existing_hobby = await Hobby.find_one(Hobby.name == hobby_name)
-    if not existing_hobby:
+async def get_hobby(hobby_name: str, topic_cursor: Optional[str] = None, topic_limit: int = DEFAULT_PAGE_SIZE) -> HobbyDetail:
+    detail = await hobby_flight.do((hobby_name, topic_cursor, topic_limit), lambda: load_hobby(hobby_name, topic_cursor, topic_limit))
+    if detail is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Hobby not found")
+    return detail
+
 
-    if current_user.email == existing_hobby.owner or current_user.role == Role.admin or (current_user.role == Role.moderator and hobby_name in current_user.moderated_hobbies):
-        for field, value in hobby.model_dump().items():
-            if value is not None:
-                setattr(existing_hobby, field, value)
-        await existing_hobby.save()
+def can_moderate(current_user: User, hobby_name: str) -> bool:
+    return current_user.role == Role.admin or (current_user.role == Role.moderator and hobby_name in current_user.moderated_hobbies)
+
+def owner_filter(current_user: User, hobby_name: str) -> dict:
+    if can_moderate(current_user, hobby_name):
+        return {}
+    return {"owner": current_user.email}
+
+async def raise_write_failure(model, filters: dict, not_found: str, forbidden: str, expected_version: Optional[int] = None):
+    existing = await model.find_one(filters)
+    if not existing:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=not_found)
+    if expected_version is not None and existing.version != expected_version:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Version conflict, current version is {existing.version}")
+    raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=forbidden)
+
+
+async def delete_hobby(hobby_name: str, current_user: User = Depends(get_current_user)):
+    deleted_at = datetime.now()
+    deleted = can_moderate(current_user, hobby_name) and await hobby_database.mark_deleted({"name": hobby_name}, deleted_at)
+    if deleted:
+        await Topic.get_motor_collection().update_many({"hobby_name": hobby_name, **LIVE}, tombstone(deleted_at))
+        await hobby_cache.invalidate(hobby_name)
+        search_index.remove("hobby", deleted["_id"])
+        await versions.bump(HOBBIES_VERSION, hobby_version(hobby_name))
+        job = await deleter.enqueue("hobby", hobby_name, deleted["_id"], deleted_at=deleted_at)
+        return {"message": "Hobby deleted successfully", "job_id": str(job.id)}
+    await raise_write_failure(Hobby, {"name": hobby_name, **LIVE}, "Hobby not found", "Not enough permissions to delete the hobby")
+
+async def edit_hobby(hobby_name: str, hobby: HobbyCreate, current_user: User = Depends(get_current_user), expected_version: Optional[int] = None):
+    try:
+        updated = await hobby_database.update_where(merge_filters({"name": hobby_name, **LIVE}, owner_filter(current_user, hobby_name)), hobby, expected_version)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Hobby already exists")
+    if updated:
+        await hobby_cache.invalidate(hobby_name, updated.name)
+        search_index.add("hobby", updated)
+        await versions.bump(HOBBIES_VERSION, hobby_version(hobby_name), hobby_version(updated.name))
         return {"message": "Hobby updated successfully"}
-    else:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions")
+    await raise_write_failure(Hobby, {"name": hobby_name, **LIVE}, "Hobby not found", "Not enough permissions", expected_version)
 
 
 async def check_topic(hobby_name: str, topic_name: str):
-    existing_topic = await Topic.find_one(Topic.name == topic_name)
+    existing_topic = await find_topic(hobby_name, topic_name)
     if not existing_topic:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Topic not found")
-    if existing_topic.hobby_name != hobby_name:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="The topic is not related to the given hobby")
     return existing_topic
 
 
+def build_topic(hobby_name: str, topic: TopicCreate, owner: str) -> Topic:
+    return Topic(**topic.model_dump(exclude={"hobby_name"}), hobby_name=hobby_name, owner=owner)
+
 async def create_topic(hobby_name: str, topic: TopicCreate, current_user: User = Depends(get_current_user)):
-    hobby = await Hobby.find_one(Hobby.name == hobby_name)
+    hobby = await find_hobby(hobby_name)
     if not hobby:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Hobby not found")
     
-    existing_topic = await Topic.find_one({"hobby_name": hobby_name, "name": topic.name})
+    existing_topic = await find_topic(hobby_name, topic.name)
     if existing_topic:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Topic already exists in this hobby")
 
-    new_topic = Topic(**topic.dict(), hobby_name=hobby_name, owner=current_user.email)
-    await new_topic.insert()
-    hobby.topics.append(new_topic.id)
-    await hobby.save()
+    new_topic = build_topic(hobby_name, topic, current_user.email)
+    try:
+        await new_topic.insert()
+    except DuplicateKeyError:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Topic already exists in this hobby")
+    await topic_cache.put(topic_key(hobby_name, new_topic.name), new_topic)
+    search_index.add("topic", new_topic)
+    record_activity(hobby_name)
+    await hobby_database.increment({"name": hobby_name}, {"topic_count": 1}, datetime.now())
+    await versions.bump(HOBBIES_VERSION, hobby_version(hobby_name))
+    return new_topic
 
 
-async def edit_topic(hobby_name: str, topic_name: str, topic: TopicCreate, current_user: User = Depends(get_current_user)):
-    existing_topic = await check_topic(hobby_name, topic_name)
-    
-    if current_user.email == existing_topic.owner or current_user.role == Role.admin or (current_user.role == Role.moderator and hobby_name in current_user.moderated_hobbies):
-        for field, value in topic.model_dump().items():
-            if value is not None:
-                setattr(existing_topic, field, value)
-        await existing_topic.save()
+async def create_topics(hobby_name: str, topics: List[TopicCreate], current_user: User):
+    check_bulk_size(topics)
+    if not await find_hobby(hobby_name):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Hobby not found")
+    names = [topic.name for topic in topics]
+    taken = set(await Topic.distinct("name", {"hobby_name": hobby_name, "name": {"$in": names}}))
+    rejected, indexes, documents = {}, [], []
+    for index, topic in enumerate(topics):
+        if topic.name in taken:
+            rejected[index] = "Topic already exists in this hobby"
+            continue
+        taken.add(topic.name)
+        indexes.append(index)
+        documents.append(build_topic(hobby_name, topic, current_user.email))
+    results = await topic_database.save_many(documents)
+    inserted = [document for document, result in zip(documents, results) if result["error"] is None]
+    if inserted:
+        await hobby_database.increment({"name": hobby_name}, {"topic_count": len(inserted)}, datetime.now())
+        await versions.bump(HOBBIES_VERSION, hobby_version(hobby_name))
+    for document in inserted:
+        search_index.add("topic", document)
+    if inserted:
+        record_activity(hobby_name, amount=len(inserted))
+    return bulk_result(rejected, indexes, results)
+
+
+async def edit_topic(hobby_name: str, topic_name: str, topic: TopicCreate, current_user: User = Depends(get_current_user), expected_version: Optional[int] = None):
+    topic_filter = {"hobby_name": hobby_name, "name": topic_name, **LIVE}
+    try:
+        updated = await topic_database.update_where(merge_filters(topic_filter, owner_filter(current_user, hobby_name)), topic, expected_version, exclude={"hobby_name"})
+    except DuplicateKeyError:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Topic already exists in this hobby")
+    if updated:
+        await topic_cache.invalidate(topic_key(hobby_name, topic_name), topic_key(hobby_name, updated.name))
+        search_index.add("topic", updated)
+        await versions.bump(hobby_version(hobby_name))
         return {"message": "Topic updated successfully"}
-    else:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions")
+    await raise_write_failure(Topic, topic_filter, "Topic not found", "Not enough permissions", expected_version)
     
     
 async def delete_topic(hobby_name: str, topic_name: str, current_user: User = Depends(get_current_user)):
-    existing_topic = await check_topic(hobby_name, topic_name)
-    if current_user.email == existing_topic.owner or current_user.role == Role.admin or (current_user.role == Role.moderator and hobby_name in current_user.moderated_hobbies):
-        await existing_topic.delete()
-        return {"message": "Topic deleted successfully"}
-    else:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions")
+    topic_filter = {"hobby_name": hobby_name, "name": topic_name, **LIVE}
+    deleted_at = datetime.now()
+    deleted = await topic_database.mark_deleted(merge_filters(topic_filter, owner_filter(current_user, hobby_name)), deleted_at)
+    if deleted:
+        await topic_cache.invalidate(topic_key(hobby_name, topic_name))
+        search_index.remove("topic", deleted["_id"])
+        await hobby_database.increment({"name": hobby_name}, {"topic_count": -1, "comment_count": -deleted.get("comment_count", 0)})
+        await versions.bump(HOBBIES_VERSION, hobby_version(hobby_name))
+        job = await deleter.enqueue("topic", hobby_name, deleted["_id"], topic_name, deleted_at)
+        return {"message": "Topic deleted successfully", "job_id": str(job.id)}
+    await raise_write_failure(Topic, topic_filter, "Topic not found", "Not enough permissions")
 
 
+def build_comment(hobby_name: str, topic_name: str, comment: DiscussionCreate, owner: str) -> Discussion:
+    return Discussion(**comment.model_dump(exclude={"topic_name"}), topic_name=topic_name, hobby_name=hobby_name, owner=owner)
+
 async def create_comment(hobby_name: str, topic_name: str, comment: DiscussionCreate, current_user: User = Depends(get_current_user)):
     topic = await check_topic(hobby_name, topic_name)
-    new_comment = Discussion(**comment.model_dump(), topic_name=topic_name, owner=current_user.email)
-    await new_comment.insert()
-    topic.discussions.append(new_comment.id)
-    await topic.save()
-    return {"message": "Comment created successfully"}
+    new_comment = build_comment(hobby_name, topic_name, comment, current_user.email)
+    if comment_batcher is not None:
+        await comment_batcher.submit((topic, new_comment))
+    else:
+        await new_comment.insert()
+        await count_comments(topic, 1, new_comment.created_at)
+        search_index.add("comment", new_comment)
+    record_activity(hobby_name, topic_name)
+    await publish_comment("created", hobby_name, topic_name, new_comment)
+    return new_comment
 
 
-async def edit_comment(hobby_name: str, topic_name: str, comment_id: str, comment: DiscussionCreate, current_user: User = Depends(get_current_user)):
+async def create_comments(hobby_name: str, topic_name: str, comments: List[DiscussionCreate], current_user: User):
+    check_bulk_size(comments)
     topic = await check_topic(hobby_name, topic_name)
-    if not topic:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Topic not found")
- 
-    existing_comment = await Discussion.find_one(Discussion.id == comment_id)
-    if not existing_comment:
+    documents = [build_comment(hobby_name, topic_name, comment, current_user.email) for comment in comments]
+    results = await discussion_database.save_many(documents)
+    inserted = [document for document, result in zip(documents, results) if result["error"] is None]
+    if inserted:
+        await count_comments(topic, len(inserted), max(document.created_at for document in inserted))
+        record_activity(hobby_name, topic_name, len(inserted))
+    for document in inserted:
+        search_index.add("comment", document)
+        await publish_comment("created", hobby_name, topic_name, document)
+    return bulk_result({}, list(range(len(documents))), results)
+
+
+async def publish_comment(kind: str, hobby_name: str, topic_name: str, comment):
+    payload = comment.model_dump(by_alias=True, include=COMMENT_FIELDS) if isinstance(comment, Discussion) else comment
+    event = {"type": f"comment.{kind}", "hobby": hobby_name, "topic": topic_name, "comment": payload}
+    try:
+        await broker.publish(event, hobby_channel(hobby_name), topic_channel(hobby_name, topic_name))
+    except PyMongoError:
+        logger.exception("Could not publish %s event for %s/%s", event["type"], hobby_name, topic_name)
+
+
+async def apply_comment_counts(entries: List[tuple]):
+    topics, hobbies = {}, {}
+    for topic, amount, activity_at in entries:
+        for counts, key in ((topics, topic.id), (hobbies, topic.hobby_name)):
+            count, latest = counts.get(key, (0, None))
+            counts[key] = (count + amount, max(filter(None, (latest, activity_at)), default=None))
+    await asyncio.gather(
+        topic_database.increment_many([({"_id": id}, {"comment_count": count}, activity_at) for id, (count, activity_at) in topics.items()]),
+        hobby_database.increment_many([({"name": name}, {"comment_count": count}, activity_at) for name, (count, activity_at) in hobbies.items()]),
+    )
+    if hobbies:
+        await versions.bump(*(hobby_version(name) for name in hobbies))
+        await versions.touch(HOBBIES_VERSION)
+
+
+async def flush_counts(entries: List[tuple]) -> list:
+    await apply_comment_counts(entries)
+    return [None] * len(entries)
+
+counter_batcher = GroupCommit(flush_counts, settings.COUNTER_BATCH_WINDOW, settings.COUNTER_BATCH_SIZE)
+
+
+async def count_comments(topic: Topic, amount: int, activity_at: Optional[datetime] = None):
+    await counter_batcher.submit((topic, amount, activity_at))
+
+
+async def flush_comments(items: List[tuple]) -> list:
+    results = await discussion_database.save_many([document for _, document in items])
+    counts, outcomes = [], []
+    for (topic, document), result in zip(items, results):
+        if result["error"] is not None:
+            outcomes.append(HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Comment could not be saved: {result['error']}"))
+            continue
+        outcomes.append(document)
+        search_index.add("comment", document)
+        counts.append((topic, 1, document.created_at))
+    await apply_comment_counts(counts)
+    return outcomes
+
+comment_batcher = GroupCommit(flush_comments, settings.COMMENT_BATCH_WINDOW, settings.COMMENT_BATCH_SIZE) if settings.COMMENT_GROUP_COMMIT else None
+
+
+def thread_filter(hobby_name: str, topic_name: str) -> dict:
+    return {"topic_name": topic_name, "hobby_name": {"$in": [hobby_name, None]}}
+
+async def list_comments(hobby_name: str, topic_name: str, cursor: Optional[str] = None, since: Optional[str] = None, newest_first: bool = True, limit: int = DEFAULT_PAGE_SIZE) -> dict:
+    if cursor and since:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Use either cursor or since, not both")
+    await check_topic(hobby_name, topic_name)
+    descending = newest_first and not since
+
+    async def hot(after: Optional[str], count: int) -> list:
+        return await discussion_database.get_items(thread_filter(hobby_name, topic_name), after, count, "created_at", descending, CommentOut)
+
+    async def cold(after: Optional[str], count: int) -> list:
+        return await archiver.read(hobby_name, topic_name, after, descending, count)
+
+    after = cursor or since
+    merged = {}
+    for source in await asyncio.gather(hot(after, limit + 1), cold(after, limit + 1)):
+        for item in source:
+            merged.setdefault(item["_id"], item)
+    items = sorted(merged.values(), key=lambda item: (item["created_at"], item["_id"]), reverse=descending)[:limit + 1]
+    page = {"items": items[:limit], "next_cursor": next_cursor_for(items[limit - 1], "created_at") if len(items) > limit else None}
+    items = page["items"]
+    if descending:
+        newest = items[0] if items and not cursor else None
+    else:
+        newest = items[-1] if items else None
+    page["since_cursor"] = next_cursor_for(newest, "created_at") if newest is not None else since
+    return page
+
+
+def comment_filter(comment_id: str, hobby_name: str, topic_name: str) -> dict:
+    if not PydanticObjectId.is_valid(comment_id):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Comment not found")
+    return {"_id": PydanticObjectId(comment_id), **thread_filter(hobby_name, topic_name)}
 
-    if existing_comment.topic_name != topic_name:
+async def raise_comment_failure(comment_id: str, hobby_name: str, topic_name: str, expected_version: Optional[int] = None):
+    existing_comment = await Discussion.find_one(Discussion.id == PydanticObjectId(comment_id))
+    if existing_comment and (existing_comment.topic_name != topic_name or existing_comment.hobby_name not in (hobby_name, None)):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Comment does not belong to the specified topic")
+    await raise_write_failure(Discussion, {"_id": PydanticObjectId(comment_id)}, "Comment not found", "Insufficient permissions", expected_version)
+
 
-    if current_user.email == existing_comment.owner or current_user.role == Role.admin or (
-        current_user.role == Role.moderator and hobby_name in current_user.moderated_hobbies
-    ):
-        
-        for field, value in comment.model_dump().items():
-            if value is not None:
-                setattr(existing_comment, field, value)
-        await existing_comment.save()
+async def edit_comment(hobby_name: str, topic_name: str, comment_id: str, comment: DiscussionCreate, current_user: User = Depends(get_current_user), expected_version: Optional[int] = None):
+    await check_topic(hobby_name, topic_name)
+    filters = comment_filter(comment_id, hobby_name, topic_name)
+    updated = await discussion_database.update_where(merge_filters(filters, owner_filter(current_user, hobby_name)), comment, expected_version, exclude={"topic_name"})
+    if updated:
+        search_index.add("comment", updated)
+        await publish_comment("updated", hobby_name, topic_name, updated)
         return {"message": "Comment updated successfully"}
-    else:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient permissions")
+    await raise_comment_failure(comment_id, hobby_name, topic_name, expected_version)
 
 
 async def delete_comment(hobby_name: str, topic_name: str, comment_id: str, current_user: User = Depends(get_current_user)):
     topic = await check_topic(hobby_name, topic_name)
-    if not topic:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Topic not found")
+    filters = comment_filter(comment_id, hobby_name, topic_name)
+    owner = owner_filter(current_user, hobby_name)
+    if await discussion_database.delete_where(merge_filters(filters, owner)) or await archiver.delete(hobby_name, topic_name, filters["_id"], owner):
+        await count_comments(topic, -1)
+        search_index.remove("comment", filters["_id"])
+        await publish_comment("deleted", hobby_name, topic_name, {"_id": filters["_id"]})
+        return {"message": "Comment deleted successfully"}
+    await raise_comment_failure(comment_id, hobby_name, topic_name)
 
-    existing_comment = await Discussion.find_one(Discussion.id == comment_id)
-    if not existing_comment:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Comment not found")
 
-    if current_user.email == existing_comment.owner or current_user.role == Role.admin or (
-        current_user.role == Role.moderator and hobby_name in current_user.moderated_hobbies
-    ):
-        await existing_comment.delete()
-        return {"message": "Comment deleted successfully"}
-    else:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient permissions")
\ No newline at end of file
+def merge_counters(*counters: str) -> list:
+    fields = {
+        counter: {"$add": [f"$$new.{counter}", {"$subtract": [{"$ifNull": [f"${counter}", 0]}, {"$ifNull": [f"$$new.seen.{counter}", 0]}]}]}
+        for counter in counters
+    }
+    fields["last_activity_at"] = {"$cond": [
+        {"$eq": ["$last_activity_at", "$$new.seen.last_activity_at"]},
+        "$$new.last_activity_at",
+        {"$max": ["$last_activity_at", "$$new.last_activity_at"]},
+    ]}
+    return [{"$set": fields}]
+
+async def reconcile_counters():
+    started = time.perf_counter()
+    topics = Topic.get_motor_collection()
+    await topics.aggregate([
+        {"$lookup": {
+            "from": Discussion.get_collection_name(),
+            "localField": "name",
+            "foreignField": "topic_name",
+            "let": {"hobby": "$hobby_name"},
+            "pipeline": [
+                {"$match": {"$expr": {"$eq": [{"$ifNull": ["$hobby_name", "$$hobby"]}, "$$hobby"]}}},
+                {"$group": {"_id": None, "count": {"$sum": 1}, "last": {"$max": "$created_at"}}},
+            ],
+            "as": "stats",
+        }},
+        {"$lookup": {
+            "from": DiscussionArchive.get_collection_name(),
+            "let": {"hobby": "$hobby_name", "name": "$name"},
+            "pipeline": [
+                {"$match": {"$expr": {"$and": [{"$eq": ["$topic_name", "$$name"]}, {"$eq": ["$hobby_name", "$$hobby"]}]}}},
+                {"$group": {"_id": None, "count": {"$sum": "$count"}, "last": {"$max": "$end"}}},
+            ],
+            "as": "archived",
+        }},
+        {"$project": {
+            "comment_count": {"$add": [{"$ifNull": [{"$first": "$stats.count"}, 0]}, {"$ifNull": [{"$first": "$archived.count"}, 0]}]},
+            "last_activity_at": {"$ifNull": [{"$max": [{"$first": "$stats.last"}, {"$first": "$archived.last"}]}, None]},
+            "seen": {"comment_count": "$comment_count", "last_activity_at": "$last_activity_at"},
+        }},
+        {"$merge": {"into": Topic.get_collection_name(), "on": "_id", "whenMatched": merge_counters("comment_count"), "whenNotMatched": "discard"}},
+    ]).to_list(None)
+    await Hobby.get_motor_collection().aggregate([
+        {"$lookup": {
+            "from": Topic.get_collection_name(),
+            "localField": "name",
+            "foreignField": "hobby_name",
+            "pipeline": [
+                {"$match": LIVE},
+                {"$group": {"_id": None, "count": {"$sum": 1}, "comments": {"$sum": "$comment_count"}, "last": {"$max": "$last_activity_at"}}},
+            ],
+            "as": "stats",
+        }},
+        {"$project": {
+            "topic_count": {"$ifNull": [{"$first": "$stats.count"}, 0]},
+            "comment_count": {"$ifNull": [{"$first": "$stats.comments"}, 0]},
+            "last_activity_at": {"$ifNull": [{"$first": "$stats.last"}, None]},
+            "seen": {"topic_count": "$topic_count", "comment_count": "$comment_count", "last_activity_at": "$last_activity_at"},
+        }},
+        {"$merge": {"into": Hobby.get_collection_name(), "on": "_id", "whenMatched": merge_counters("topic_count", "comment_count"), "whenNotMatched": "discard"}},
+    ]).to_list(None)
+    await versions.bump(EPOCH)
+    elapsed = time.perf_counter() - started
+    logger.info("Reconciled hobby and topic counters in %.2fs", elapsed)
+    return {"elapsed_s": elapsed}
+
+reconciler = CounterReconciler(reconcile_counters, settings.COUNTER_RECONCILE_INTERVAL, settings.COUNTER_RECONCILE_LEASE_SECONDS)
+
+async def warm_caches(limit: int) -> int:
+    hobbies = await Hobby.find(LIVE).sort("_id").limit(limit).to_list()
+    for hobby in hobbies:
+        hobby_cache.store(hobby.name, hobby)
+    await versions.etag(HOBBIES_VERSION)
+    return len(hobbies)
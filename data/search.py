@@ -0,0 +1,49 @@
+from typing import Dict, Optional
+from fastapi import HTTPException, status
+from data.hobby import LIVE, deleter, search_index
+from database.pagination import DEFAULT_PAGE_SIZE
+from models.hobby import Topic
+from service.deletion import deleted_before
+from service.search import KINDS
+
+
+async def pending_deletions() -> dict:
+    clauses = []
+    for job in await deleter.pending():
+        clause = {"hobby_name": job["hobby_name"], "created_at": {"$lte": deleted_before(job)}}
+        if job["kind"] == "topic":
+            clause.update(topic_name=job["topic_name"], hobby_name={"$in": [job["hobby_name"], None]})
+        clauses.append(clause)
+    return {"$nor": clauses} if clauses else {}
+
+
+async def search_scopes(hobby_name: Optional[str], topic_name: Optional[str]) -> Dict[str, dict]:
+    if topic_name:
+        topic_filter = {"name": topic_name, **LIVE}
+        if hobby_name:
+            topic_filter["hobby_name"] = hobby_name
+        comment_filter = {"topic_name": topic_name}
+        if hobby_name:
+            comment_filter["hobby_name"] = {"$in": [hobby_name, None]}
+        return {"topic": topic_filter, "comment": comment_filter}
+    if hobby_name:
+        topic_names = await Topic.distinct("name", {"hobby_name": hobby_name, **LIVE})
+        return {
+            "hobby": {"name": hobby_name, **LIVE},
+            "topic": {"hobby_name": hobby_name, **LIVE},
+            "comment": {"topic_name": {"$in": topic_names}, "hobby_name": {"$in": [hobby_name, None]}},
+        }
+    return {"hobby": dict(LIVE), "topic": dict(LIVE), "comment": {}}
+
+
+async def search_content(query: str, hobby_name: Optional[str] = None, topic_name: Optional[str] = None, kind: Optional[str] = None, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE):
+    if kind is not None and kind not in KINDS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"kind must be one of {', '.join(KINDS)}")
+    scopes = await search_scopes(hobby_name, topic_name)
+    if kind is not None:
+        scopes = {k: v for k, v in scopes.items() if k == kind}
+    if not scopes:
+        return {"items": [], "next_cursor": None}
+    if "comment" in scopes:
+        scopes["comment"] = {**scopes["comment"], **await pending_deletions()}
+    return await search_index.search(query, scopes, cursor, limit)
@@ -1,25 +1,34 @@
+import asyncio
+from typing import List, Optional
 from fastapi import Depends, HTTPException, status
 from beanie import PydanticObjectId
 from fastapi.security import OAuth2PasswordBearer
-from database.conection import Settings
-from models.users import User, Role, UserProfileUpdate
-from service.users import ALGORITHM, HashPassword, authenticate
-from jose import JWTError, jwt
+from database.conection import Database, bulk_result, check_bulk_size
+from database.pagination import DEFAULT_PAGE_SIZE
+from models.users import User, Role, UserOut, UserProfileUpdate
+from service.singleflight import SingleFlight
+from service.users import HashPassword, authenticate, decode_access_token, get_user_by_email, hashing_service, invalidate_user, settings
+from jose import JWTError
+from pymongo.errors import DuplicateKeyError
 
 
 hash_password = HashPassword()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/user/signin")
-settings = Settings()
+user_database = Database(User)
+user_flight = SingleFlight(settings.SINGLE_FLIGHT_MAX_WAITERS)
 
 
-async def get_all_users():
-    users = await User.find_all().to_list()
-    return users
+async def get_all_users(cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE):
+    return await user_database.get_page(cursor=cursor, limit=limit, projection_model=UserOut)
+
+def stream_users(role: Optional[Role] = None):
+    filters = {"role": role.value} if role else None
+    return user_database.stream(filters, projection_model=UserOut)
 
 async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM])
-        user = await User.find_one(User.email == payload.get("user"))
+        payload = decode_access_token(token)
+        user = await get_user_by_email(payload.get("user"))
         if not user:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
         return user
@@ -27,18 +36,40 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
 
 async def get_user_by_id(user_id: PydanticObjectId):
-    user = await User.find_one(User.id == user_id)
+    user = await user_flight.do(user_id, lambda: user_database.get_one({"_id": user_id}, UserOut))
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     return user
 
-async def get_moderator_users():
-    moderators = await User.find_all(User.role == Role.moderator).to_list()
-    return moderators
+async def get_moderator_users(cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE):
+    return await user_database.get_page({"role": Role.moderator.value}, cursor=cursor, limit=limit, projection_model=UserOut)
+
+async def get_admin_users(cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE):
+    return await user_database.get_page({"role": Role.admin.value}, cursor=cursor, limit=limit, projection_model=UserOut)
+
+
+async def create_users(users: List[User]):
+    check_bulk_size(users)
+    emails = [user.email for user in users]
+    taken = set(await User.distinct("email", {"email": {"$in": emails}}))
+    rejected, indexes, documents = {}, [], []
+    for index, user in enumerate(users):
+        if user.email in taken:
+            rejected[index] = "email already inuse"
+            continue
+        taken.add(user.email)
+        indexes.append(index)
+        documents.append(User(email=user.email, password=user.password, name=user.name, hobby=user.hobby, role=Role.user))
+
+    chunk = hashing_service.max_workers
+    for start in range(0, len(documents), chunk):
+        batch = documents[start:start + chunk]
+        hashes = await asyncio.gather(*(hash_password.create_hash(user.password) for user in batch))
+        for user, hashed_password in zip(batch, hashes):
+            user.password = hashed_password
 
-async def get_admin_users():
-    admins = await User.find_all(User.role == Role.admin).to_list()
-    return admins
+    results = await user_database.save_many(documents)
+    return bulk_result(rejected, indexes, results)
 
 
 async def is_email_in_use(email: str) -> bool:
@@ -46,30 +77,37 @@ async def is_email_in_use(email: str) -> bool:
     return user_with_email is not None
 
 async def edit_user(user: User, current_user_email: str = Depends(authenticate)):  
-    if user.email != current_user_email:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions")
-    
-    email_in_use = await is_email_in_use(user.email)
-    if email_in_use:
+    if user.email != current_user_email and await is_email_in_use(user.email):
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Email already in use")
 
-    hashed_password = hash_password.create_hash(user.password)
+    hashed_password = await hash_password.create_hash(user.password)
     update_data = {
         "email": user.email,
         "password": hashed_password
     }
 
-    await User.find_one_and_update(User.email == current_user_email, {"$set": update_data})
+    try:
+        updated = await User.get_motor_collection().find_one_and_update({"email": current_user_email}, {"$set": update_data}, projection={"_id": 1})
+    except DuplicateKeyError:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Email already in use")
+    if not updated:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    await invalidate_user(current_user_email, user.email)
 
     return {"message": "User profile updated successfully"}
 
 
-async def update_profile(user: User, profile_data: UserProfileUpdate):
+async def update_profile(email: str, profile_data: UserProfileUpdate):
+    update_data = {}
     if profile_data.name:
-        user.name = profile_data.name
+        update_data["name"] = profile_data.name
     if profile_data.hobby:
-        user.hobby = profile_data.hobby
-    await user.save()
+        update_data["hobby"] = [profile_data.hobby]
+    if update_data:
+        result = await User.get_motor_collection().update_one({"email": email}, {"$set": update_data})
+        await invalidate_user(email)
+        if not result.matched_count:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     return {"message": "Profile updated successfully"}
     
 
@@ -79,5 +117,6 @@ async def delete_user(user: User, current_user_email: str = Depends(authenticate
     existing_user = await User.find_one(User.email == user.email)
     if not existing_user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-        await existing_user.delete() 
+    await existing_user.delete()
+    await invalidate_user(user.email)
     return {"message": "User successfully deleted"}
\ No newline at end of file
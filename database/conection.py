@@ -1,28 +1,202 @@
-from typing import Optional
-from beanie import init_beanie, PydanticObjectId
-from models.hobby import Hobby, Topic, Discussion
+from datetime import datetime
+from functools import lru_cache
+from typing import AsyncIterator, List, Optional
+from beanie import init_beanie, PydanticObjectId, UpdateResponse
+from database.indexes import verify_query_plans
+from database.monitoring import pool_stats
+from service.metrics import command_metrics
+from database.serialization import projection_for
+from database.pagination import DEFAULT_PAGE_SIZE, STREAM_BATCH_SIZE, keyset_filter, keyset_sort, merge_filters, next_cursor_for
+from models.hobby import Hobby, Topic, Discussion, DiscussionArchive
+from models.jobs import DeletionJob
 from models.users import User
-from motor.motor_asyncio import AsyncIOMotorClient
-from pydantic import BaseModel, BaseSettings
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from fastapi import HTTPException, status
+from pydantic import BaseModel
+from pydantic_settings import BaseSettings
+from pymongo import ReadPreference, UpdateOne
+from pymongo.errors import BulkWriteError
+
+MAX_BULK_SIZE = 1000
+DOCUMENT_MODELS = [Hobby, Topic, Discussion, DiscussionArchive, User, DeletionJob]
+READ_PREFERENCES = {
+    "primary": ReadPreference.PRIMARY,
+    "primaryPreferred": ReadPreference.PRIMARY_PREFERRED,
+    "secondary": ReadPreference.SECONDARY,
+    "secondaryPreferred": ReadPreference.SECONDARY_PREFERRED,
+    "nearest": ReadPreference.NEAREST,
+}
+
+_client: Optional[AsyncIOMotorClient] = None
 
 class Settings(BaseSettings):
-    DATABASE_URL: Optional[str]
-    SECRET_KEY: Optional[str]
+    DATABASE_URL: Optional[str] = None
+    DATABASE_NAME: str = "hobbies"
+    SECRET_KEY: Optional[str] = None
+    USER_CACHE_SIZE: int = 10000
+    USER_CACHE_TTL: float = 60.0
+    HASH_WORKERS: Optional[int] = None
+    HASH_MAX_PENDING: int = 64
+    LOOKUP_CACHE_SIZE: int = 10000
+    LOOKUP_CACHE_TTL: float = 30.0
+    LOOKUP_NEGATIVE_TTL: float = 5.0
+    DROP_UNDECLARED_INDEXES: bool = False
+    VERIFY_QUERY_PLANS: bool = False
+    MONGO_MAX_POOL_SIZE: int = 100
+    MONGO_MIN_POOL_SIZE: int = 0
+    MONGO_MAX_IDLE_TIME_MS: Optional[int] = None
+    MONGO_CONNECT_TIMEOUT_MS: int = 20000
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = 30000
+    MONGO_SOCKET_TIMEOUT_MS: Optional[int] = None
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: Optional[int] = None
+    MONGO_COMPRESSORS: str = ""
+    MONGO_READ_PREFERENCE: str = "primary"
+    SLOW_REQUEST_SECONDS: float = 1.0
+    PROFILE_SAMPLE_RATE: float = 0.0
+    PROFILE_RING_SIZE: int = 20
+    PROFILE_HEADER: str = "X-Profile"
+    BROKER_BACKEND: str = "memory"
+    BROKER_QUEUE_SIZE: int = 100
+    COUNTER_RECONCILE_INTERVAL: Optional[float] = None
+    COUNTER_RECONCILE_LEASE_SECONDS: float = 600.0
+    COUNTER_BATCH_WINDOW: float = 0.005
+    COUNTER_BATCH_SIZE: int = 200
+    SEARCH_BACKEND: str = "mongo"
+    DELETE_BATCH_SIZE: int = 500
+    DELETE_BATCH_PAUSE: float = 0.05
+    DELETE_LEASE_SECONDS: float = 60.0
+    DELETE_POLL_INTERVAL: float = 30.0
+    VERSION_CACHE_TTL: float = 5.0
+    VERSION_COALESCE_INTERVAL: float = 1.0
+    HTTP_CACHE_MAX_AGE: int = 0
+    SINGLE_FLIGHT_MAX_WAITERS: int = 1000
+    COMMENT_GROUP_COMMIT: bool = False
+    COMMENT_BATCH_WINDOW: float = 0.005
+    COMMENT_BATCH_SIZE: int = 200
+    ARCHIVE_INTERVAL: Optional[float] = None
+    ARCHIVE_AFTER_DAYS: float = 90.0
+    ARCHIVE_INACTIVE_DAYS: float = 30.0
+    ARCHIVE_BUCKET_SIZE: int = 200
+    ARCHIVE_BATCH_PAUSE: float = 0.05
+    TRENDING_WINDOW: float = 3600.0
+    TRENDING_BUCKET: float = 60.0
+    TRENDING_TOP_K: int = 100
+    TRENDING_MAX_KEYS: int = 10000
+    TRENDING_SYNC_INTERVAL: float = 10.0
+    TRENDING_PERSIST: bool = True
+    WEB_HOST: str = "0.0.0.0"
+    WEB_PORT: int = 8000
+    WEB_WORKERS: Optional[int] = None
+    WARMUP_HOBBIES: int = 500
+    READY_PING_TIMEOUT: float = 1.0
     
     class Config:
         env_file = ".env"
+
+    def client_options(self) -> dict:
+        options = {
+            "maxPoolSize": self.MONGO_MAX_POOL_SIZE,
+            "minPoolSize": self.MONGO_MIN_POOL_SIZE,
+            "maxIdleTimeMS": self.MONGO_MAX_IDLE_TIME_MS,
+            "connectTimeoutMS": self.MONGO_CONNECT_TIMEOUT_MS,
+            "serverSelectionTimeoutMS": self.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+            "socketTimeoutMS": self.MONGO_SOCKET_TIMEOUT_MS,
+            "waitQueueTimeoutMS": self.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        }
+        if self.MONGO_COMPRESSORS:
+            options["compressors"] = self.MONGO_COMPRESSORS
+        return {k: v for k, v in options.items() if v is not None}
     
     async def initialize_database(self):
-        client = AsyncIOMotorClient(self.DATABASE_URL)
-        await init_beanie(database=client.get_default_database(), document_models=[Hobby, Topic, Discussion, User])
+        Database.read_preference = READ_PREFERENCES[self.MONGO_READ_PREFERENCE]
+        await init_beanie(
+            database=get_database(self),
+            document_models=DOCUMENT_MODELS,
+            allow_index_dropping=self.DROP_UNDECLARED_INDEXES,
+        )
+        if self.VERIFY_QUERY_PLANS:
+            await verify_query_plans()
+
+@lru_cache
+def get_settings() -> Settings:
+    return Settings()
+
+def get_client(settings: Settings) -> AsyncIOMotorClient:
+    global _client
+    if _client is None:
+        _client = AsyncIOMotorClient(settings.DATABASE_URL, event_listeners=[pool_stats, command_metrics], **settings.client_options())
+    return _client
+
+def get_database(settings: Settings) -> AsyncIOMotorDatabase:
+    return get_client(settings).get_default_database(settings.DATABASE_NAME)
+
+def use_client(client: AsyncIOMotorClient):
+    global _client
+    _client = client
+
+def close_client():
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
+
+def check_bulk_size(items: list):
+    if not items:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Empty batch")
+    if len(items) > MAX_BULK_SIZE:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=f"Batches are limited to {MAX_BULK_SIZE} items")
+
+def bulk_result(rejected: dict, indexes: List[int], results: List[dict]) -> dict:
+    items = [{"index": index, "id": None, "error": error} for index, error in rejected.items()]
+    items.extend({**result, "index": index} for index, result in zip(indexes, results))
+    items.sort(key=lambda item: item["index"])
+    failed = sum(1 for item in items if item["error"])
+    return {"inserted": len(items) - failed, "failed": failed, "items": items}
+
+def tombstone(deleted_at: datetime) -> list:
+    return [{"$set": {
+        "deleted_at": deleted_at,
+        "deleted_name": "$name",
+        "name": {"$concat": ["$name", "~deleted~", {"$toString": "$_id"}]},
+    }}]
+
+def increment_query(counters: dict, activity_at: Optional[datetime] = None) -> dict:
+    update_query = {"$inc": counters}
+    if activity_at is not None:
+        update_query["$max"] = {"last_activity_at": activity_at}
+    return update_query
 
 class Database:
-    def __init__(self, model):
+    read_preference = ReadPreference.PRIMARY
+
+    def __init__(self, model, read_preference=None):
         self.model = model
+        if read_preference is not None:
+            self.read_preference = read_preference
+
+    def read_collection(self):
+        return self.model.get_motor_collection().with_options(read_preference=self.read_preference)
         
     async def save(self, document):
         await document.create()
         return document
+
+    async def save_many(self, documents: list) -> List[dict]:
+        if not documents:
+            return []
+        for document in documents:
+            if document.id is None:
+                document.id = PydanticObjectId()
+        errors = {}
+        try:
+            await self.model.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get("writeErrors", []):
+                errors[error["index"]] = error.get("errmsg", "write failed")
+        return [
+            {"index": i, "id": None if i in errors else str(document.id), "error": errors.get(i)}
+            for i, document in enumerate(documents)
+        ]
     
     async def get(self, id: PydanticObjectId):
         doc = await self.model.get(id)
@@ -30,24 +204,65 @@ class Database:
             return doc
         return None
     
-    async def get_all(self):
-        docs = await self.model.find_all().to_list()
-        return docs
+    async def get_all(self, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE):
+        return await self.get_page(cursor=cursor, limit=limit)
+
+    async def get_items(self, filters: Optional[dict] = None, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE, sort_field: str = "_id", descending: bool = False, projection_model=None):
+        query = merge_filters(filters, keyset_filter(cursor, sort_field, descending))
+        sort = keyset_sort(sort_field, descending)
+        if projection_model is None:
+            return await self.model.find(query).sort(sort).limit(limit).to_list()
+        return await self.read_collection().find(query, projection_for(projection_model)).sort(sort).limit(limit).to_list(None)
+
+    async def get_page(self, filters: Optional[dict] = None, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE, sort_field: str = "_id", descending: bool = False, projection_model=None):
+        docs = await self.get_items(filters, cursor, limit + 1, sort_field, descending, projection_model)
+        next_cursor = None
+        if len(docs) > limit:
+            docs = docs[:limit]
+            next_cursor = next_cursor_for(docs[-1], sort_field)
+        return {"items": docs, "next_cursor": next_cursor}
+
+    async def get_one(self, filters: dict, projection_model):
+        return await self.read_collection().find_one(filters, projection_for(projection_model))
+
+    async def stream(self, filters: Optional[dict] = None, projection_model=None, batch_size: int = STREAM_BATCH_SIZE) -> AsyncIterator[dict]:
+        projection = projection_for(projection_model) if projection_model is not None else None
+        cursor = self.read_collection().find(filters or {}, projection).sort("_id", 1).batch_size(batch_size)
+        async for doc in cursor:
+            yield doc
     
-    async def update(self, id: PydanticObjectId, body: BaseModel):
-        des_body = body.dict()
+    async def update(self, id: PydanticObjectId, body: BaseModel, filters: Optional[dict] = None, expected_version: Optional[int] = None, exclude: Optional[set] = None):
+        return await self.update_where(merge_filters({"_id": id}, filters), body, expected_version, exclude)
+
+    async def update_where(self, filters: dict, body: BaseModel, expected_version: Optional[int] = None, exclude: Optional[set] = None):
+        des_body = body.model_dump(exclude=exclude)
         des_body = {k: v for k, v in des_body.items() if v is not None}
         update_query = {"$set": des_body}
+        if "version" in self.model.model_fields:
+            update_query["$inc"] = {"version": 1}
+        if expected_version is not None:
+            filters = merge_filters(filters, {"version": expected_version})
+        return await self.model.find_one(filters).update(update_query, response_type=UpdateResponse.NEW_DOCUMENT)
+
+    async def increment(self, filters: dict, counters: dict, activity_at: Optional[datetime] = None):
+        result = await self.model.get_motor_collection().update_one(filters, increment_query(counters, activity_at))
+        return result.matched_count
+
+    async def increment_many(self, updates: List[tuple]):
+        if not updates:
+            return 0
+        requests = [UpdateOne(filters, increment_query(counters, activity_at)) for filters, counters, activity_at in updates]
+        result = await self.model.get_motor_collection().bulk_write(requests, ordered=False)
+        return result.matched_count
+
+    async def mark_deleted(self, filters: dict, deleted_at: datetime):
+        return await self.model.get_motor_collection().find_one_and_update(
+            merge_filters(filters, {"deleted_at": None}),
+            tombstone(deleted_at),
+        )
+
+    async def delete(self, id: PydanticObjectId, filters: Optional[dict] = None):
+        return await self.delete_where(merge_filters({"_id": id}, filters))
 
-        doc = await self.get(id)
-        if not doc:
-            return None
-        await doc.update(update_query)
-        return doc
-
-    async def delete(self, id: PydanticObjectId):
-        doc = await self.get(id)
-        if not doc:
-            return None
-        await doc.delete()
-        return True
\ No newline at end of file
+    async def delete_where(self, filters: dict):
+        return await self.model.get_motor_collection().find_one_and_delete(filters)
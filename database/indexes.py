@@ -0,0 +1,71 @@
+import logging
+from typing import Iterator, List, Set
+
+import pymongo
+
+from models.hobby import Discussion, Hobby, Topic
+from models.users import User
+
+
+logger = logging.getLogger(__name__)
+
+QUERY_SHAPES = [
+    ("hobby by name", Hobby, {"name": ""}, None),
+    ("hobbies page", Hobby, {}, [("_id", pymongo.ASCENDING)]),
+    ("topic by hobby and name", Topic, {"hobby_name": "", "name": ""}, None),
+    ("topics sharing a name", Topic, {"name": "", "hobby_name": {"$ne": ""}}, None),
+    ("topics of hobby", Topic, {"hobby_name": ""}, [("_id", pymongo.ASCENDING)]),
+    ("comments of topic", Discussion, {"topic_name": ""}, [("created_at", pymongo.ASCENDING), ("_id", pymongo.ASCENDING)]),
+    ("comments of topic, newest first", Discussion, {"topic_name": ""}, [("created_at", pymongo.DESCENDING), ("_id", pymongo.DESCENDING)]),
+    ("hobby text search", Hobby, {"$text": {"$search": "search"}}, None),
+    ("topic text search", Topic, {"$text": {"$search": "search"}}, None),
+    ("comment text search", Discussion, {"$text": {"$search": "search"}}, None),
+    ("user by email", User, {"email": ""}, None),
+    ("users by role", User, {"role": "admin"}, [("_id", pymongo.ASCENDING)]),
+]
+
+
+def _stages(plan: dict) -> Iterator[str]:
+    if "stage" in plan:
+        yield plan["stage"]
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            yield from _stages(plan[key])
+    for child in plan.get("inputStages", []):
+        yield from _stages(child)
+
+
+async def verify_query_plans() -> List[dict]:
+    reports = []
+    for label, model, filters, sort in QUERY_SHAPES:
+        cursor = model.get_motor_collection().find(filters)
+        if sort:
+            cursor = cursor.sort(sort)
+        explain = await cursor.limit(1).explain()
+        stages = list(_stages(explain["queryPlanner"]["winningPlan"]))
+        report = {"query": label, "collection": model.get_collection_name(), "stages": stages, "collscan": "COLLSCAN" in stages}
+        if report["collscan"]:
+            logger.warning("Query %r on %s is a collection scan: %s", label, report["collection"], " <- ".join(stages))
+        else:
+            logger.info("Query %r on %s uses %s", label, report["collection"], " <- ".join(stages))
+        reports.append(report)
+    return reports
+
+
+def declared_index_names(model) -> Set[str]:
+    return {"_id_"} | {index.name for index in model.get_settings().indexes}
+
+
+async def prune_undeclared_indexes(models: list, dry_run: bool = True) -> List[dict]:
+    reports = []
+    for model in models:
+        collection = model.get_motor_collection()
+        declared = declared_index_names(model)
+        async for index in collection.list_indexes():
+            if index["name"] in declared:
+                continue
+            if not dry_run:
+                await collection.drop_index(index["name"])
+                logger.warning("Dropped undeclared index %r on %s", index["name"], model.get_collection_name())
+            reports.append({"collection": model.get_collection_name(), "index": index["name"], "key": dict(index["key"]), "dropped": not dry_run})
+    return reports
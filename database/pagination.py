@@ -0,0 +1,82 @@
+import base64
+from datetime import datetime
+from typing import Any, AsyncIterator, Optional, Tuple
+
+import orjson
+import pymongo
+from bson import ObjectId
+from fastapi import HTTPException, status
+from fastapi.responses import StreamingResponse
+
+from database.serialization import dumps
+
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+STREAM_BATCH_SIZE = 500
+
+
+def encode_cursor(id: ObjectId, value: Any = None) -> str:
+    payload = {"i": str(id)}
+    if isinstance(value, datetime):
+        payload["d"] = value.isoformat()
+    elif value is not None:
+        payload["v"] = value
+    return base64.urlsafe_b64encode(orjson.dumps(payload)).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[ObjectId, Any]:
+    try:
+        payload = orjson.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        id = ObjectId(payload["i"])
+        value = datetime.fromisoformat(payload["d"]) if "d" in payload else payload.get("v")
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    return id, value
+
+
+def merge_filters(*filters: Optional[dict]) -> dict:
+    filters = [f for f in filters if f]
+    if not filters:
+        return {}
+    if len(filters) == 1:
+        return filters[0]
+    return {"$and": filters}
+
+
+def keyset_filter(cursor: Optional[str], sort_field: str = "_id", descending: bool = False) -> dict:
+    if not cursor:
+        return {}
+    id, value = decode_cursor(cursor)
+    op = "$lt" if descending else "$gt"
+    if sort_field == "_id":
+        return {"_id": {op: id}}
+    return {"$or": [{sort_field: {op: value}}, {sort_field: value, "_id": {op: id}}]}
+
+
+def keyset_sort(sort_field: str = "_id", descending: bool = False) -> list:
+    direction = pymongo.DESCENDING if descending else pymongo.ASCENDING
+    if sort_field == "_id":
+        return [("_id", direction)]
+    return [(sort_field, direction), ("_id", direction)]
+
+
+def next_cursor_for(doc: Any, sort_field: str = "_id") -> str:
+    if isinstance(doc, dict):
+        return encode_cursor(doc["_id"], None if sort_field == "_id" else doc.get(sort_field))
+    return encode_cursor(doc.id, None if sort_field == "_id" else getattr(doc, sort_field))
+
+
+async def _ndjson_chunks(docs: AsyncIterator[dict], batch_size: int) -> AsyncIterator[bytes]:
+    buffer = []
+    async for doc in docs:
+        buffer.append(dumps(doc))
+        if len(buffer) >= batch_size:
+            yield b"\n".join(buffer) + b"\n"
+            buffer = []
+    if buffer:
+        yield b"\n".join(buffer) + b"\n"
+
+
+def ndjson_response(docs: AsyncIterator[dict], batch_size: int = STREAM_BATCH_SIZE) -> StreamingResponse:
+    return StreamingResponse(_ndjson_chunks(docs, batch_size), media_type="application/x-ndjson")
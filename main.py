@@ -0,0 +1,80 @@
+from service.startup import startup
+
+import asyncio
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI
+
+from data.hobby import archiver, broker, comment_batcher, counter_batcher, deleter, hobby_cache, reconciler, search_index, topic_cache, trending, versions, warm_caches
+from database.conection import close_client, get_database, get_settings
+from database.serialization import MongoJSONResponse
+from routes.admin import admin_router, profile_store
+from routes.hobby import hobby_router
+from routes.metrics import metrics_router
+from routes.search import search_router
+from routes.users import user_router
+from service.metrics import MetricsMiddleware
+from service.profiling import ProfilingMiddleware
+from service.users import hashing_service, is_admin_request, user_sync
+
+
+settings = get_settings()
+startup.record("import")
+
+
+async def warm_up(app: FastAPI):
+    app.openapi()
+    await asyncio.gather(hashing_service.warm_up(), warm_caches(settings.WARMUP_HOBBIES))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    with startup.phase("database"):
+        await settings.initialize_database()
+    database = get_database(settings)
+    with startup.phase("services"):
+        await broker.start(database)
+        await user_sync.start(broker)
+        await hobby_cache.start(broker)
+        await topic_cache.start(broker)
+        await versions.start(database)
+        await search_index.start()
+        deleter.start()
+        await archiver.start(database)
+        await trending.start(database if settings.TRENDING_PERSIST else None)
+        await reconciler.start(database)
+    with startup.phase("warmup"):
+        await warm_up(app)
+    startup.mark_ready()
+    try:
+        yield
+    finally:
+        await reconciler.stop()
+        if comment_batcher is not None:
+            await comment_batcher.close()
+        await counter_batcher.close()
+        await trending.stop()
+        await archiver.stop()
+        await deleter.stop()
+        await versions.stop()
+        await topic_cache.stop()
+        await hobby_cache.stop()
+        await user_sync.stop()
+        await broker.stop()
+        hashing_service.shutdown()
+        close_client()
+
+
+def create_app() -> FastAPI:
+    app = FastAPI(lifespan=lifespan, default_response_class=MongoJSONResponse)
+    app.middleware("http")(ProfilingMiddleware(profile_store, settings.PROFILE_SAMPLE_RATE, settings.PROFILE_HEADER, is_admin_request))
+    app.middleware("http")(MetricsMiddleware(settings.SLOW_REQUEST_SECONDS))
+    app.include_router(user_router, prefix="/user")
+    app.include_router(hobby_router)
+    app.include_router(search_router)
+    app.include_router(metrics_router)
+    app.include_router(admin_router)
+    return app
+
+
+app = create_app()
@@ -1,17 +1,27 @@
 # models/hobby.py
 
 from pydantic import BaseModel, Field
-from typing import List
-from beanie import Document
+from typing import List, Optional
+from beanie import Document, PydanticObjectId
 from datetime import datetime
+from pymongo import ASCENDING, TEXT, IndexModel
 
 class Hobby(Document):
-    name: str = Field(unique=True)
+    name: str
     description: str = Field(default="")
     owner: str
+    version: int = 0
+    topic_count: int = 0
+    comment_count: int = 0
+    last_activity_at: Optional[datetime] = None
+    deleted_at: Optional[datetime] = None
     
     class Settings:
         collection = "hobbies"
+        indexes = [
+            IndexModel([("name", ASCENDING)], name="name_unique", unique=True),
+            IndexModel([("name", TEXT), ("description", TEXT)], name="text_search", weights={"name": 5, "description": 1}),
+        ]
     
     class Config:
         schema_extra = {
@@ -32,9 +42,20 @@ class Topic(Document):
     description: str = Field(default="")
     hobby_name: str  
     owner: str
+    version: int = 0
+    comment_count: int = 0
+    last_activity_at: Optional[datetime] = None
+    deleted_at: Optional[datetime] = None
     
     class Settings:
         collection = "topics"
+        indexes = [
+            IndexModel([("hobby_name", ASCENDING), ("name", ASCENDING)], name="hobby_name_name_unique", unique=True),
+            IndexModel([("hobby_name", ASCENDING), ("_id", ASCENDING)], name="hobby_name_id"),
+            IndexModel([("name", ASCENDING)], name="name"),
+            IndexModel([("last_activity_at", ASCENDING)], name="last_activity_at"),
+            IndexModel([("name", TEXT), ("description", TEXT)], name="text_search", weights={"name": 5, "description": 1}),
+        ]
 
     class Config:
         schema_extra = {
@@ -54,11 +75,17 @@ class TopicCreate(BaseModel):
 class Discussion(Document):
     comment: str
     topic_name: str  
+    hobby_name: Optional[str] = None
     owner: str  
     created_at: datetime = Field(default_factory=datetime.now)
+    version: int = 0
 
     class Settings:
             collection = "discussions"
+            indexes = [
+                IndexModel([("topic_name", ASCENDING), ("created_at", ASCENDING), ("_id", ASCENDING)], name="topic_name_created_at_id"),
+                IndexModel([("comment", TEXT)], name="text_search"),
+            ]
 
     class Config:
             
@@ -72,7 +99,98 @@ class Discussion(Document):
 
 
 
+class DiscussionArchive(Document):
+    hobby_name: str
+    topic_name: str
+    start: datetime
+    end: datetime
+    count: int = 0
+    comments: List[dict] = []
+
+    class Settings:
+        collection = "discussion_archive"
+        indexes = [
+            IndexModel([("topic_name", ASCENDING), ("hobby_name", ASCENDING), ("start", ASCENDING)], name="topic_start"),
+            IndexModel([("topic_name", ASCENDING), ("hobby_name", ASCENDING), ("end", ASCENDING)], name="topic_end"),
+        ]
+
+
 class DiscussionCreate(BaseModel):
 
     comment: str
     topic_name: str
+
+
+class HobbyOut(BaseModel):
+    id: PydanticObjectId = Field(alias="_id")
+    name: str
+    description: str = Field(default="")
+    owner: str
+    version: int = 0
+    topic_count: int = 0
+    comment_count: int = 0
+    last_activity_at: Optional[datetime] = None
+
+    class Config:
+        populate_by_name = True
+
+
+class CommentOut(BaseModel):
+    id: PydanticObjectId = Field(alias="_id")
+    comment: str
+    topic_name: str
+    owner: str
+    created_at: datetime
+    version: int = 0
+
+    class Config:
+        populate_by_name = True
+
+
+class ThreadPage(BaseModel):
+    items: List[CommentOut]
+    next_cursor: Optional[str] = None
+    since_cursor: Optional[str] = None
+
+
+class TopicSummary(BaseModel):
+    id: PydanticObjectId = Field(alias="_id")
+    name: str
+    description: str = Field(default="")
+    owner: str
+    comment_count: int = 0
+    last_activity_at: Optional[datetime] = None
+
+    class Config:
+        populate_by_name = True
+
+
+class HobbyDetail(BaseModel):
+    id: PydanticObjectId = Field(alias="_id")
+    name: str
+    description: str = Field(default="")
+    owner: str
+    version: int = 0
+    topic_count: int = 0
+    comment_count: int = 0
+    last_activity_at: Optional[datetime] = None
+    topics: List[TopicSummary] = []
+    next_topic_cursor: Optional[str] = None
+
+    class Config:
+        populate_by_name = True
+
+
+class SearchHit(BaseModel):
+    kind: str
+    id: PydanticObjectId = Field(alias="_id")
+    score: float
+    hobby_name: Optional[str] = None
+    topic_name: Optional[str] = None
+    title: Optional[str] = None
+    text: str = ""
+    owner: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+    class Config:
+        populate_by_name = True
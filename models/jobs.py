@@ -0,0 +1,26 @@
+from datetime import datetime
+from typing import Dict, Optional
+from beanie import Document, PydanticObjectId
+from pydantic import Field
+from pymongo import ASCENDING, IndexModel
+
+
+class DeletionJob(Document):
+    kind: str
+    hobby_name: str
+    topic_name: Optional[str] = None
+    target_id: PydanticObjectId
+    deleted_at: Optional[datetime] = None
+    status: str = "pending"
+    removed: Dict[str, int] = {}
+    lease_until: Optional[datetime] = None
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.now)
+    updated_at: datetime = Field(default_factory=datetime.now)
+    finished_at: Optional[datetime] = None
+
+    class Settings:
+        collection = "deletion_jobs"
+        indexes = [
+            IndexModel([("status", ASCENDING), ("created_at", ASCENDING)], name="status_created_at"),
+        ]
@@ -2,7 +2,8 @@
 from enum import Enum
 from typing import Optional, List
 from pydantic import BaseModel, EmailStr, Field
-from beanie import Document
+from beanie import Document, PydanticObjectId
+from pymongo import ASCENDING, IndexModel
 
 
 class Role(str, Enum):
@@ -20,6 +21,10 @@ class User(Document):
 
     class Settings:
         collection = "users"
+        indexes = [
+            IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+            IndexModel([("role", ASCENDING), ("_id", ASCENDING)], name="role_id"),
+        ]
         
     class Config:
         json_shema_extra ={
@@ -30,6 +35,18 @@ class User(Document):
         }
    
 
+class UserOut(BaseModel):
+    id: PydanticObjectId = Field(alias="_id")
+    email: str
+    name: str = ""
+    hobby: List[str] = []
+    role: Role = Role.user
+    moderated_hobbies: List[str] = []
+
+    class Config:
+        populate_by_name = True
+
+
 class UserProfileUpdate(BaseModel):
     name: Optional[str] = None
     hobby: Optional[str] = None
@@ -0,0 +1,59 @@
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi.responses import PlainTextResponse
+from data.hobby import archiver, deleter, reconciler
+from data.users import get_current_user
+from database.conection import DOCUMENT_MODELS
+from database.indexes import prune_undeclared_indexes
+from database.serialization import MongoJSONResponse
+from models.users import Role, User
+from service.profiling import ProfileStore, profile_as_text
+from service.users import settings
+
+
+admin_router = APIRouter(tags=["Admin"])
+profile_store = ProfileStore(settings.PROFILE_RING_SIZE)
+
+
+async def require_admin(current_user: User = Depends(get_current_user)) -> User:
+    if current_user.role != Role.admin:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permission")
+    return current_user
+
+
+@admin_router.get("/admin/profiles")
+async def list_profiles(current_user: User = Depends(require_admin)):
+    return profile_store.list()
+
+
+@admin_router.get("/admin/profiles/{profile_id}")
+async def get_profile(profile_id: int, format: str = "text", sort: str = "cumulative", current_user: User = Depends(require_admin)):
+    profile = profile_store.get(profile_id)
+    if not profile:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+    if format == "pstats":
+        return Response(
+            profile["stats"],
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.pstats"'},
+        )
+    return PlainTextResponse(profile_as_text(profile, sort))
+
+
+@admin_router.post("/admin/reconcile-counters")
+async def reconcile(current_user: User = Depends(require_admin)):
+    return MongoJSONResponse(await reconciler.run())
+
+
+@admin_router.get("/admin/deletions")
+async def list_deletions(current_user: User = Depends(require_admin)):
+    return MongoJSONResponse(await deleter.jobs())
+
+
+@admin_router.post("/admin/archive")
+async def archive_discussions(current_user: User = Depends(require_admin)):
+    return MongoJSONResponse(await archiver.run())
+
+
+@admin_router.post("/admin/indexes/prune")
+async def prune_indexes(dry_run: bool = True, current_user: User = Depends(require_admin)):
+    return await prune_undeclared_indexes(DOCUMENT_MODELS, dry_run)
@@ -1,56 +1,123 @@
-from typing import Dict, List
-from fastapi import APIRouter, Depends, HTTPException, status
-from data.hobby import create_hobby, delete_comment, delete_hobby, delete_topic, edit_comment, edit_hobby, edit_topic, list_hobbies, get_hobby, create_topic
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, WebSocket, status
+from fastapi.responses import StreamingResponse
+from data.hobby import HOBBIES_VERSION, broker, hobby_version, trending, trending_items, versions, check_topic, find_hobby, find_topic, create_comment, create_comments, create_topics, create_hobby, delete_comment, delete_hobby, delete_topic, edit_comment, edit_hobby, edit_topic, list_hobbies, get_hobby, create_topic, list_comments, stream_hobbies
 from data.users import get_current_user
-from models.hobby import Discussion, DiscussionCreate, Hobby, HobbyCreate, Topic, TopicCreate
+from database.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, ndjson_response
+from models.common import BulkResult, Page
+from models.hobby import CommentOut, DiscussionCreate, ThreadPage, Hobby, HobbyCreate, HobbyDetail, HobbyOut, Topic, TopicCreate
 from models.users import User
-from service.users import authenticate
+from database.serialization import MongoJSONResponse
+from service.broker import hobby_channel, pump_websocket, sse_events, topic_channel
+from service.etags import cache_headers, not_modified
+from service.users import settings
 
-hobby_router = APIRouter()
+hobby_router = APIRouter(default_response_class=MongoJSONResponse)
 
 @hobby_router.post("/hobby/create", response_model=Hobby)
-async def new_hobby(hobby: HobbyCreate, current_user: User = Depends(authenticate)):
+async def new_hobby(hobby: HobbyCreate, current_user: User = Depends(get_current_user)):
     return await create_hobby(hobby, current_user)
 
-@hobby_router.get("/hobby/all", response_model=List[Hobby])
-async def all_hobbies():
-    return await list_hobbies()
+@hobby_router.get("/trending")
+async def trending_view(kind: str = Query("hobby", pattern="^(hobby|topic)$"), limit: int = Query(10, ge=1, le=settings.TRENDING_TOP_K)):
+    return {"kind": kind, "window_seconds": trending.window, "updated_at": trending.updated_at, "items": trending_items(kind, limit)}
 
-@hobby_router.get("/hobby/{hobby_name}", response_model=Dict)
-async def hobby(hobby_name: str):
-    return await get_hobby(hobby_name)
+@hobby_router.get("/hobby/all", response_model=Page[HobbyOut])
+async def all_hobbies(request: Request, cursor: Optional[str] = None, limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), stream: bool = False):
+    if stream:
+        return ndjson_response(stream_hobbies())
+    etag = await versions.etag(HOBBIES_VERSION, variant=f"{cursor}|{limit}")
+    cached = not_modified(request, etag, settings.HTTP_CACHE_MAX_AGE)
+    if cached:
+        return cached
+    return MongoJSONResponse(await list_hobbies(cursor, limit), headers=cache_headers(etag, settings.HTTP_CACHE_MAX_AGE))
+
+@hobby_router.get("/hobby/{hobby_name}", response_model=HobbyDetail)
+async def hobby(request: Request, response: Response, hobby_name: str, topic_cursor: Optional[str] = None, topic_limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)):
+    etag = await versions.etag(hobby_version(hobby_name), variant=f"{topic_cursor}|{topic_limit}")
+    cached = not_modified(request, etag, settings.HTTP_CACHE_MAX_AGE)
+    if cached:
+        return cached
+    detail = await get_hobby(hobby_name, topic_cursor, topic_limit)
+    response.headers.update(cache_headers(etag, settings.HTTP_CACHE_MAX_AGE))
+    return detail
 
 @hobby_router.delete("/hobby/{hobby_name}/delete")
 async def hobby_delete(hobby_name: str, current_user: User = Depends(get_current_user)):
     return await delete_hobby(hobby_name, current_user)
 
 @hobby_router.put("/hobby/{hobby_name}/edit")
-async def hobby_edit(hobby_name: str, hobby: HobbyCreate, current_user: User = Depends(get_current_user)):
-    return await edit_hobby(hobby_name, hobby, current_user)
+async def hobby_edit(hobby_name: str, hobby: HobbyCreate, expected_version: Optional[int] = None, current_user: User = Depends(get_current_user)):
+    return await edit_hobby(hobby_name, hobby, current_user, expected_version)
 
 @hobby_router.post("/hobby/{hobby_name}/topic", response_model=Topic)
-async def new_topic(hobby_name: str, topic: TopicCreate, current_user: User = Depends(authenticate)):
+async def new_topic(hobby_name: str, topic: TopicCreate, current_user: User = Depends(get_current_user)):
     return await create_topic(hobby_name, topic, current_user)
 
+@hobby_router.post("/hobby/{hobby_name}/topics/bulk", response_model=BulkResult)
+async def new_topics(hobby_name: str, topics: List[TopicCreate], current_user: User = Depends(get_current_user)):
+    return await create_topics(hobby_name, topics, current_user)
+
 
 @hobby_router.put("/hobby/{hobby_name}/{topic_name}/edit")
-async def topic_edit(hobby_name: str, topic_name: str, topic: TopicCreate, current_user: User = Depends(get_current_user)):
-    return await edit_topic(hobby_name, topic_name, topic, current_user)
+async def topic_edit(hobby_name: str, topic_name: str, topic: TopicCreate, expected_version: Optional[int] = None, current_user: User = Depends(get_current_user)):
+    return await edit_topic(hobby_name, topic_name, topic, current_user, expected_version)
 
 @hobby_router.delete("/hobby/{hobby_name}/{topic_name}")
 async def topic_delete(hobby_name: str, topic_name: str, current_user: User = Depends(get_current_user)):
     return await delete_topic(hobby_name, topic_name, current_user)
 
 
-@hobby_router.post("/hobby/{hobby_name}/{topic_name}/comment", response_model=Discussion)
+@hobby_router.post("/hobby/{hobby_name}/{topic_name}/comment", response_model=CommentOut)
 async def comment_create(hobby_name: str, topic_name: str, comment: DiscussionCreate, current_user: User = Depends(get_current_user)):
     return await create_comment(hobby_name, topic_name, comment, current_user)
 
-@hobby_router.put("/hobby/{hobby_name}/{topic_name}/comment/{comment_id}", response_model=Discussion)
-async def comment_edit(hobby_name: str, topic_name: str, comment_id: str, comment: DiscussionCreate, current_user: User = Depends(get_current_user)):
-    return await edit_comment(hobby_name, topic_name, comment_id, comment, current_user)
+@hobby_router.get("/hobby/{hobby_name}/{topic_name}/comments", response_model=ThreadPage)
+async def comment_thread(hobby_name: str, topic_name: str, cursor: Optional[str] = None, since: Optional[str] = None, order: str = Query("newest", pattern="^(newest|oldest)$"), limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)):
+    return MongoJSONResponse(await list_comments(hobby_name, topic_name, cursor, since, order == "newest", limit))
+
+@hobby_router.post("/hobby/{hobby_name}/{topic_name}/comments/bulk", response_model=BulkResult)
+async def comments_create(hobby_name: str, topic_name: str, comments: List[DiscussionCreate], current_user: User = Depends(get_current_user)):
+    return await create_comments(hobby_name, topic_name, comments, current_user)
+
+@hobby_router.put("/hobby/{hobby_name}/{topic_name}/comment/{comment_id}")
+async def comment_edit(hobby_name: str, topic_name: str, comment_id: str, comment: DiscussionCreate, expected_version: Optional[int] = None, current_user: User = Depends(get_current_user)):
+    return await edit_comment(hobby_name, topic_name, comment_id, comment, current_user, expected_version)
+
+
+@hobby_router.delete("/hobby/{hobby_name}/{topic_name}/comment/{comment_id}")
+async def comment_delete(hobby_name: str, topic_name: str, comment_id: str, current_user: User = Depends(get_current_user)):
+    return await delete_comment(hobby_name, topic_name, comment_id, current_user)
+
+
+async def hobby_or_404(hobby_name: str):
+    if not await find_hobby(hobby_name):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Hobby not found")
+
+@hobby_router.get("/hobby/{hobby_name}/events")
+async def hobby_events(hobby_name: str):
+    await hobby_or_404(hobby_name)
+    return StreamingResponse(sse_events(broker.subscribe(hobby_channel(hobby_name))), media_type="text/event-stream")
+
+@hobby_router.get("/hobby/{hobby_name}/{topic_name}/events")
+async def topic_events(hobby_name: str, topic_name: str):
+    await check_topic(hobby_name, topic_name)
+    return StreamingResponse(sse_events(broker.subscribe(topic_channel(hobby_name, topic_name))), media_type="text/event-stream")
 
+@hobby_router.websocket("/hobby/{hobby_name}/ws")
+async def hobby_feed(websocket: WebSocket, hobby_name: str):
+    if not await find_hobby(hobby_name):
+        await websocket.close(code=4404, reason="Hobby not found")
+        return
+    await websocket.accept()
+    with broker.subscribe(hobby_channel(hobby_name)) as subscription:
+        await pump_websocket(websocket, subscription)
 
-@hobby_router.delete("/hobby/{hobby_name}/{topic_name}/comment/{comment_id}", response_model=Discussion)
-async def comment_edit(hobby_name: str, topic_name: str, comment_id: str, comment: DiscussionCreate, current_user: User = Depends(get_current_user)):
-    return await delete_comment(hobby_name, topic_name, comment_id, comment, current_user)
\ No newline at end of file
+@hobby_router.websocket("/hobby/{hobby_name}/{topic_name}/ws")
+async def topic_feed(websocket: WebSocket, hobby_name: str, topic_name: str):
+    if not await find_topic(hobby_name, topic_name):
+        await websocket.close(code=4404, reason="Topic not found")
+        return
+    await websocket.accept()
+    with broker.subscribe(topic_channel(hobby_name, topic_name)) as subscription:
+        await pump_websocket(websocket, subscription)
@@ -0,0 +1,53 @@
+import asyncio
+
+from fastapi import APIRouter, HTTPException, status
+from fastapi.responses import PlainTextResponse
+from pymongo.errors import PyMongoError
+from data.hobby import archiver, reconciler, broker, comment_batcher, counter_batcher, deleter, hobby_cache, hobby_flight, hobby_list_flight, search_index, topic_cache, trending, versions
+from data.users import user_flight
+from database.conection import get_database
+from database.monitoring import pool_stats
+from service.metrics import registry
+from service.startup import startup
+from service.users import cache_stats, hashing_service, settings
+
+
+metrics_router = APIRouter(tags=["Metrics"])
+
+registry.register_stats("startup", startup.stats)
+registry.register_stats("auth_cache", cache_stats)
+registry.register_stats("hobby_cache", hobby_cache.stats)
+registry.register_stats("topic_cache", topic_cache.stats)
+registry.register_stats("password_hashing", hashing_service.stats)
+registry.register_stats("mongo_pool", pool_stats.stats)
+registry.register_stats("feed", broker.stats)
+registry.register_stats("search", search_index.stats)
+registry.register_stats("cascade_delete", deleter.stats)
+registry.register_stats("discussion_archive", archiver.stats)
+registry.register_stats("counter_reconcile", reconciler.stats)
+registry.register_stats("counter_group_commit", counter_batcher.stats)
+registry.register_stats("trending", trending.stats)
+registry.register_stats("etag_versions", versions.stats)
+registry.register_stats("singleflight_hobby", hobby_flight.stats)
+registry.register_stats("singleflight_hobby_list", hobby_list_flight.stats)
+registry.register_stats("singleflight_user", user_flight.stats)
+if comment_batcher is not None:
+    registry.register_stats("comment_group_commit", comment_batcher.stats)
+
+
+@metrics_router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
+@metrics_router.get("/ready", include_in_schema=False)
+async def ready():
+    try:
+        await asyncio.wait_for(get_database(settings).command("ping"), settings.READY_PING_TIMEOUT)
+    except (asyncio.TimeoutError, PyMongoError):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Database is unreachable",
+            headers={"Retry-After": "1"},
+        )
+    return startup.report()
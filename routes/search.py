@@ -0,0 +1,15 @@
+from typing import Optional
+from fastapi import APIRouter, Query
+from data.search import search_content
+from database.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from database.serialization import MongoJSONResponse
+from models.common import Page
+from models.hobby import SearchHit
+
+
+search_router = APIRouter(tags=["Search"], default_response_class=MongoJSONResponse)
+
+
+@search_router.get("/search", response_model=Page[SearchHit])
+async def search(q: str = Query(..., min_length=1, max_length=200), hobby: Optional[str] = None, topic: Optional[str] = None, kind: Optional[str] = None, cursor: Optional[str] = None, limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)):
+    return MongoJSONResponse(await search_content(q, hobby, topic, kind, cursor, limit))
@@ -0,0 +1,42 @@
+import argparse
+import logging
+import os
+
+import uvicorn
+
+from database.conection import get_settings
+
+
+logger = logging.getLogger(__name__)
+
+SHARED_BACKENDS = {"BROKER_BACKEND": "mongo", "SEARCH_BACKEND": "mongo"}
+
+
+def main():
+    settings = get_settings()
+    cores = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Serve the API from a pool of worker processes, one per core by default.")
+    parser.add_argument("--host", default=settings.WEB_HOST)
+    parser.add_argument("--port", type=int, default=settings.WEB_PORT)
+    parser.add_argument("--workers", type=int, default=settings.WEB_WORKERS or cores)
+    parser.add_argument("--graceful-timeout", type=int, default=30)
+    args = parser.parse_args()
+
+    if args.workers > 1:
+        if settings.HASH_WORKERS is None:
+            os.environ["HASH_WORKERS"] = str(max(cores // args.workers, 1))
+        for name, backend in SHARED_BACKENDS.items():
+            if getattr(settings, name) != backend:
+                logger.warning("%s=%s keeps state per process; set it to %s when running %d workers", name, getattr(settings, name), backend, args.workers)
+
+    uvicorn.run(
+        "main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        timeout_graceful_shutdown=args.graceful_timeout,
+    )
+
+
+if __name__ == "__main__":
+    main()
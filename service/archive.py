@@ -0,0 +1,163 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+from database.pagination import decode_cursor
+from models.hobby import Discussion, DiscussionArchive, Topic
+
+
+logger = logging.getLogger(__name__)
+
+ARCHIVED_FIELDS = ("_id", "comment", "owner", "created_at", "version")
+
+
+async def topic_comments(hobby_name: str, topic_name: str) -> dict:
+    shared = await Topic.get_motor_collection().count_documents({"name": topic_name, "hobby_name": {"$ne": hobby_name}}, limit=1)
+    if shared:
+        return {"topic_name": topic_name, "hobby_name": hobby_name}
+    return {"topic_name": topic_name, "hobby_name": {"$in": [hobby_name, None]}}
+
+
+class DiscussionArchiver:
+    def __init__(self, archive_after: timedelta, inactive_after: timedelta, bucket_size: int, pause: float, interval: Optional[float] = None, lease_seconds: float = 300.0, on_archived: Optional[Callable[[str, List[ObjectId]], None]] = None):
+        self.archive_after = archive_after
+        self.inactive_after = inactive_after
+        self.bucket_size = bucket_size
+        self.pause = pause
+        self.interval = interval
+        self.lease_seconds = lease_seconds
+        self.on_archived = on_archived
+        self.runs = 0
+        self.buckets = 0
+        self.archived = 0
+        self._leases = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self, database):
+        self._leases = database["archive_runs"]
+        if self.interval:
+            self._task = asyncio.create_task(self._run_periodically())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run_periodically(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run()
+            except PyMongoError:
+                logger.exception("Discussion archival failed")
+
+    async def _lease(self) -> bool:
+        now = datetime.now()
+        try:
+            await self._leases.find_one_and_update(
+                {"_id": "lease", "$or": [{"until": None}, {"until": {"$lt": now}}]},
+                {"$set": {"until": now + timedelta(seconds=self.lease_seconds), "renewed_at": now}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+            return True
+        except DuplicateKeyError:
+            return False
+
+    async def _release(self, summary: dict):
+        await self._leases.update_one({"_id": "lease"}, {"$set": {"until": None, "last_run": summary}})
+
+    async def run(self) -> dict:
+        if not await self._lease():
+            return {"skipped": "another worker holds the archive lease"}
+        started = datetime.now()
+        summary = {"started_at": started, "topics": 0, "buckets": 0, "comments": 0}
+        try:
+            topics = Topic.get_motor_collection()
+            inactive = {"last_activity_at": {"$lt": started - self.inactive_after}, "deleted_at": None}
+            last_id = None
+            while True:
+                filters = dict(inactive, _id={"$gt": last_id}) if last_id is not None else inactive
+                batch = await topics.find(filters, {"name": 1, "hobby_name": 1}).sort("_id", 1).limit(100).to_list(None)
+                if not batch:
+                    break
+                for topic in batch:
+                    buckets, comments = await self.archive_topic(topic["hobby_name"], topic["name"], started - self.archive_after)
+                    summary["topics"] += 1 if buckets else 0
+                    summary["buckets"] += buckets
+                    summary["comments"] += comments
+                last_id = batch[-1]["_id"]
+        finally:
+            summary["finished_at"] = datetime.now()
+            await self._release(summary)
+        self.runs += 1
+        logger.info("Archived %d comments into %d buckets across %d topics", summary["comments"], summary["buckets"], summary["topics"])
+        return summary
+
+    async def archive_topic(self, hobby_name: str, topic_name: str, cutoff: datetime) -> tuple:
+        discussions = Discussion.get_motor_collection()
+        archive = DiscussionArchive.get_motor_collection()
+        filters = dict(await topic_comments(hobby_name, topic_name), created_at={"$lt": cutoff})
+        buckets = comments = 0
+        while True:
+            docs = await discussions.find(filters, {field: 1 for field in ARCHIVED_FIELDS}).sort([("created_at", 1), ("_id", 1)]).limit(self.bucket_size).to_list(None)
+            if not docs:
+                return buckets, comments
+            ids = [doc["_id"] for doc in docs]
+            bucket = {
+                "hobby_name": hobby_name,
+                "topic_name": topic_name,
+                "start": docs[0]["created_at"],
+                "end": docs[-1]["created_at"],
+                "count": len(docs),
+                "comments": docs,
+            }
+            await archive.replace_one({"_id": ids[0]}, bucket, upsert=True)
+            await discussions.delete_many({"_id": {"$in": ids}})
+            if self.on_archived is not None:
+                self.on_archived("comment", ids)
+            buckets += 1
+            comments += len(ids)
+            self.buckets += 1
+            self.archived += len(ids)
+            await self._leases.update_one({"_id": "lease"}, {"$set": {"until": datetime.now() + timedelta(seconds=self.lease_seconds)}})
+            await asyncio.sleep(self.pause)
+
+    async def read(self, hobby_name: str, topic_name: str, cursor: Optional[str], descending: bool, limit: int) -> List[dict]:
+        position = decode_cursor(cursor)[::-1] if cursor else None
+        filters = {"topic_name": topic_name, "hobby_name": hobby_name}
+        bound = "start" if descending else "end"
+        if position is not None:
+            filters[bound] = {"$lte" if descending else "$gte": position[0]}
+        buckets = DiscussionArchive.get_motor_collection().find(filters).sort(bound, -1 if descending else 1).batch_size(4)
+        items = []
+        async for bucket in buckets:
+            comments = reversed(bucket["comments"]) if descending else bucket["comments"]
+            for comment in comments:
+                key = (comment["created_at"], comment["_id"])
+                if position is not None and (key >= position if descending else key <= position):
+                    continue
+                items.append(dict(comment, topic_name=topic_name))
+                if len(items) >= limit:
+                    await buckets.close()
+                    return items
+        return items
+
+    async def delete(self, hobby_name: str, topic_name: str, comment_id: ObjectId, owner_filter: dict) -> bool:
+        result = await DiscussionArchive.get_motor_collection().update_one(
+            {"topic_name": topic_name, "hobby_name": hobby_name, "comments": {"$elemMatch": {"_id": comment_id, **owner_filter}}},
+            {"$pull": {"comments": {"_id": comment_id}}, "$inc": {"count": -1}},
+        )
+        return bool(result.modified_count)
+
+    def stats(self) -> dict:
+        return {"runs": self.runs, "buckets": self.buckets, "archived": self.archived}
@@ -0,0 +1,211 @@
+import asyncio
+import logging
+import uuid
+from typing import AsyncIterator, Dict, Optional, Set
+
+from fastapi import WebSocket, WebSocketDisconnect
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid, PyMongoError
+
+from database.serialization import dumps
+
+
+logger = logging.getLogger(__name__)
+
+SSE_KEEPALIVE_SECONDS = 15.0
+
+
+def hobby_channel(hobby_name: str) -> str:
+    return f"hobby:{hobby_name}"
+
+
+def topic_channel(hobby_name: str, topic_name: str) -> str:
+    return f"topic:{hobby_name}\x1f{topic_name}"
+
+
+class Subscription:
+    def __init__(self, broker: "InProcessBroker", channels: tuple, queue_size: int):
+        self.broker = broker
+        self.channels = channels
+        self.queue: asyncio.Queue = asyncio.Queue(queue_size)
+        self.closed_reason: Optional[str] = None
+
+    def offer(self, event: dict) -> bool:
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    def close(self, reason: str):
+        if self.closed_reason is not None:
+            return
+        self.closed_reason = reason
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[dict]:
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+    async def __aiter__(self) -> AsyncIterator[dict]:
+        while True:
+            event = await self.queue.get()
+            if event is None:
+                return
+            yield event
+
+    def __enter__(self) -> "Subscription":
+        return self
+
+    def __exit__(self, *exc):
+        self.broker.unsubscribe(self)
+
+
+class InProcessBroker:
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+
+    def subscribe(self, *channels: str) -> Subscription:
+        subscription = Subscription(self, channels, self.queue_size)
+        for channel in channels:
+            self._subscribers.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        for channel in subscription.channels:
+            subscribers = self._subscribers.get(channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[channel]
+
+    def deliver(self, event: dict, channels):
+        seen = set()
+        for channel in channels:
+            for subscription in list(self._subscribers.get(channel, ())):
+                if id(subscription) in seen:
+                    continue
+                seen.add(id(subscription))
+                if subscription.offer(event):
+                    self.delivered += 1
+                else:
+                    self.dropped += 1
+                    subscription.close("slow consumer")
+                    self.unsubscribe(subscription)
+
+    async def publish(self, event: dict, *channels: str):
+        self.published += 1
+        self.deliver(event, channels)
+
+    async def start(self, database=None):
+        pass
+
+    async def stop(self):
+        for subscribers in list(self._subscribers.values()):
+            for subscription in list(subscribers):
+                subscription.close("shutdown")
+        self._subscribers.clear()
+
+    def stats(self) -> dict:
+        return {
+            "channels": len(self._subscribers),
+            "subscribers": sum(len(subscribers) for subscribers in self._subscribers.values()),
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+        }
+
+
+class MongoBroker(InProcessBroker):
+    def __init__(self, queue_size: int = 100, collection_name: str = "feed_events", collection_size: int = 64 * 1024 * 1024):
+        super().__init__(queue_size)
+        self.collection_name = collection_name
+        self.collection_size = collection_size
+        self.origin = uuid.uuid4().hex
+        self._collection = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self, database=None):
+        try:
+            await database.create_collection(self.collection_name, capped=True, size=self.collection_size)
+        except CollectionInvalid:
+            pass
+        self._collection = database[self.collection_name]
+        self._task = asyncio.create_task(self._tail())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await super().stop()
+
+    async def publish(self, event: dict, *channels: str):
+        self.published += 1
+        self.deliver(event, channels)
+        await self._collection.insert_one({"channels": list(channels), "event": event, "origin": self.origin})
+
+    async def _tail(self):
+        last = await self._collection.find_one({}, sort=[("$natural", -1)])
+        last_id = last["_id"] if last else None
+        while True:
+            query = {"_id": {"$gt": last_id}} if last_id is not None else {}
+            try:
+                cursor = self._collection.find(query, cursor_type=CursorType.TAILABLE_AWAIT)
+                async for doc in cursor:
+                    last_id = doc["_id"]
+                    if doc.get("origin") != self.origin:
+                        self.deliver(doc["event"], doc["channels"])
+            except PyMongoError:
+                logger.exception("Feed tailing cursor failed, restarting")
+            await asyncio.sleep(0.5)
+
+
+def create_broker(backend: str, queue_size: int) -> InProcessBroker:
+    if backend == "mongo":
+        return MongoBroker(queue_size)
+    return InProcessBroker(queue_size)
+
+
+async def pump_websocket(websocket: WebSocket, subscription: Subscription):
+    async def send():
+        async for event in subscription:
+            await websocket.send_text(dumps(event).decode())
+        await websocket.close(code=1013, reason=subscription.closed_reason or "")
+
+    async def receive():
+        try:
+            while True:
+                await websocket.receive_text()
+        except WebSocketDisconnect:
+            pass
+
+    sender = asyncio.create_task(send())
+    receiver = asyncio.create_task(receive())
+    try:
+        await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        sender.cancel()
+        receiver.cancel()
+
+
+async def sse_events(subscription: Subscription) -> AsyncIterator[bytes]:
+    with subscription:
+        while True:
+            try:
+                event = await subscription.get(SSE_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield b": keepalive\n\n"
+                continue
+            if event is None:
+                yield b"event: close\ndata: " + (subscription.closed_reason or "").encode() + b"\n\n"
+                return
+            yield b"event: " + event["type"].encode() + b"\ndata: " + dumps(event) + b"\n\n"
@@ -0,0 +1,144 @@
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+
+class TTLCache:
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        value, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        return {"size": len(self._data), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+
+class CacheSync:
+    def __init__(self, cache: TTLCache, channel: str):
+        self.cache = cache
+        self.channel = channel
+        self.origin = uuid.uuid4().hex
+        self.broker = None
+        self.generation = 0
+        self.sent = 0
+        self.received = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self, broker):
+        self.broker = broker
+        self._task = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.broker = None
+
+    async def _listen(self):
+        while True:
+            with self.broker.subscribe(self.channel) as subscription:
+                async for event in subscription:
+                    if event.get("origin") == self.origin:
+                        continue
+                    self.received += 1
+                    self.forget(event["keys"])
+            self.generation += 1
+            self.cache.clear()
+
+    def forget(self, keys):
+        self.generation += 1
+        for key in keys:
+            self.cache.pop(key)
+
+    async def publish(self, *keys: Hashable):
+        if self.broker is not None:
+            self.sent += 1
+            await self.broker.publish({"type": "invalidate", "origin": self.origin, "keys": list(keys)}, self.channel)
+
+    async def invalidate(self, *keys: Hashable):
+        self.forget(keys)
+        await self.publish(*keys)
+
+    def stats(self) -> dict:
+        return {"sent": self.sent, "received": self.received}
+
+
+_MISSING = object()
+
+
+class ReadThroughCache:
+    def __init__(self, model, maxsize: int, ttl: float, negative_ttl: float):
+        self.model = model
+        self.negative_ttl = negative_ttl
+        self.local = TTLCache(maxsize, ttl)
+        self.sync = CacheSync(self.local, f"cache:{model.__name__.lower()}")
+
+    async def start(self, broker):
+        await self.sync.start(broker)
+
+    async def stop(self):
+        await self.sync.stop()
+
+    async def get(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        value = self.local.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        generation = self.sync.generation
+        value = await loader()
+        if generation == self.sync.generation:
+            self.store(key, value)
+        return value
+
+    def store(self, key: str, value: Any):
+        self.local.set(key, value, self._ttl(value))
+
+    async def put(self, key: str, value: Any):
+        self.store(key, value)
+        await self.sync.publish(key)
+
+    async def invalidate(self, *keys: str):
+        await self.sync.invalidate(*keys)
+
+    def _ttl(self, value: Any) -> float:
+        return self.local.ttl if value is not None else self.negative_ttl
+
+    def stats(self) -> dict:
+        return {**self.local.stats(), **self.sync.stats()}
@@ -0,0 +1,83 @@
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+
+logger = logging.getLogger(__name__)
+
+
+class CounterReconciler:
+    def __init__(self, reconcile: Callable[[], Awaitable[dict]], interval: Optional[float] = None, lease_seconds: float = 600.0):
+        self.reconcile = reconcile
+        self.interval = interval
+        self.lease_seconds = lease_seconds
+        self.runs = 0
+        self.skipped = 0
+        self._leases = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self, database):
+        self._leases = database["reconcile_runs"]
+        if self.interval:
+            self._task = asyncio.create_task(self._run_periodically())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run_periodically(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run(scheduled=True)
+            except PyMongoError:
+                logger.exception("Counter reconciliation failed")
+
+    async def _lease(self, scheduled: bool) -> Optional[str]:
+        now = datetime.now()
+        conditions = [{"$or": [{"until": None}, {"until": {"$lt": now}}]}]
+        if scheduled:
+            conditions.append({"$or": [{"due": None}, {"due": {"$lte": now}}]})
+        holder = uuid.uuid4().hex
+        try:
+            await self._leases.find_one_and_update(
+                {"_id": "lease", "$and": conditions},
+                {"$set": {"until": now + timedelta(seconds=self.lease_seconds), "renewed_at": now, "holder": holder}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+            return holder
+        except DuplicateKeyError:
+            return None
+
+    async def run(self, scheduled: bool = False) -> dict:
+        holder = await self._lease(scheduled)
+        if holder is None:
+            self.skipped += 1
+            return {"skipped": "another worker holds the reconcile lease"}
+        started = datetime.now()
+        summary = {"started_at": started}
+        try:
+            summary.update(await self.reconcile())
+        finally:
+            release = {"until": None, "holder": None, "last_run": summary}
+            if self.interval:
+                release["due"] = started + timedelta(seconds=self.interval)
+            result = await self._leases.update_one({"_id": "lease", "holder": holder}, {"$set": release})
+            if not result.matched_count:
+                logger.warning("Reconcile lease expired before the run finished, leaving it to its new holder")
+        self.runs += 1
+        return summary
+
+    def stats(self) -> dict:
+        return {"runs": self.runs, "skipped": self.skipped}
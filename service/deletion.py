@@ -0,0 +1,150 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import PyMongoError
+
+from models.hobby import Discussion, DiscussionArchive, Hobby, Topic
+from models.jobs import DeletionJob
+from service.archive import topic_comments
+
+
+logger = logging.getLogger(__name__)
+
+
+def deleted_before(job: dict) -> datetime:
+    return job.get("deleted_at") or job["created_at"]
+
+
+class CascadeDeleter:
+    def __init__(self, batch_size: int, pause: float, lease_seconds: float, poll_interval: float, on_removed: Optional[Callable[[str, List[ObjectId]], None]] = None):
+        self.batch_size = batch_size
+        self.pause = pause
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.on_removed = on_removed
+        self.completed = 0
+        self.failed = 0
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    async def enqueue(self, kind: str, hobby_name: str, target_id: ObjectId, topic_name: Optional[str] = None, deleted_at: Optional[datetime] = None) -> DeletionJob:
+        job = DeletionJob(kind=kind, hobby_name=hobby_name, topic_name=topic_name, target_id=target_id, deleted_at=deleted_at)
+        await job.insert()
+        self._wake.set()
+        return job
+
+    def start(self):
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def claim(self) -> Optional[dict]:
+        now = datetime.now()
+        return await DeletionJob.get_motor_collection().find_one_and_update(
+            {"status": {"$in": ["pending", "running"]}, "$or": [{"lease_until": None}, {"lease_until": {"$lt": now}}]},
+            {"$set": {"status": "running", "lease_until": now + timedelta(seconds=self.lease_seconds), "updated_at": now}},
+            sort=[("created_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def run(self):
+        while True:
+            self._wake.clear()
+            job = None
+            try:
+                job = await self.claim()
+                if job is not None:
+                    await self.process(job)
+                    continue
+            except PyMongoError as e:
+                self.failed += 1
+                logger.exception("Cascade deletion failed, will retry after the lease expires")
+                await self.record_error(job, e)
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def record_error(self, job: Optional[dict], error: Exception):
+        if job is None:
+            return
+        try:
+            await DeletionJob.get_motor_collection().update_one({"_id": job["_id"]}, {"$set": {"error": str(error), "updated_at": datetime.now()}})
+        except PyMongoError:
+            pass
+
+    async def progress(self, job: dict, kind: str, count: int):
+        now = datetime.now()
+        await DeletionJob.get_motor_collection().update_one(
+            {"_id": job["_id"]},
+            {"$inc": {f"removed.{kind}": count}, "$set": {"lease_until": now + timedelta(seconds=self.lease_seconds), "updated_at": now}},
+        )
+        await asyncio.sleep(self.pause)
+
+    async def delete_batches(self, job: dict, model, kind: str, filters: dict):
+        collection = model.get_motor_collection()
+        while True:
+            ids = [doc["_id"] for doc in await collection.find(filters, {"_id": 1}).limit(self.batch_size).to_list(None)]
+            if not ids:
+                return
+            result = await collection.delete_many({"_id": {"$in": ids}})
+            if self.on_removed is not None:
+                self.on_removed(kind, ids)
+            await self.progress(job, kind, result.deleted_count)
+
+    async def comment_filter(self, hobby_name: str, topic_name: str, cutoff: datetime) -> dict:
+        return dict(await topic_comments(hobby_name, topic_name), created_at={"$lte": cutoff})
+
+    async def delete_topic_tree(self, job: dict, hobby_name: str, topic_name: str, topic_id: ObjectId):
+        cutoff = deleted_before(job)
+        await self.delete_batches(job, Discussion, "comment", await self.comment_filter(hobby_name, topic_name, cutoff))
+        await self.delete_batches(job, DiscussionArchive, "archive_bucket", {"topic_name": topic_name, "hobby_name": hobby_name, "start": {"$lte": cutoff}})
+        await Topic.get_motor_collection().delete_one({"_id": topic_id})
+        if self.on_removed is not None:
+            self.on_removed("topic", [topic_id])
+        await self.progress(job, "topic", 1)
+
+    async def process(self, job: dict):
+        if job["kind"] == "topic":
+            await self.delete_topic_tree(job, job["hobby_name"], job["topic_name"], job["target_id"])
+        else:
+            topics = Topic.get_motor_collection()
+            filters = {"hobby_name": job["hobby_name"], "deleted_at": {"$ne": None, "$lte": deleted_before(job)}}
+            while True:
+                batch = await topics.find(filters, {"name": 1, "deleted_name": 1}).limit(self.batch_size).to_list(None)
+                if not batch:
+                    break
+                for topic in batch:
+                    await self.delete_topic_tree(job, job["hobby_name"], topic.get("deleted_name", topic["name"]), topic["_id"])
+            await Hobby.get_motor_collection().delete_one({"_id": job["target_id"]})
+            await self.progress(job, "hobby", 1)
+        now = datetime.now()
+        await DeletionJob.get_motor_collection().update_one(
+            {"_id": job["_id"]},
+            {"$set": {"status": "done", "lease_until": None, "error": None, "updated_at": now, "finished_at": now}},
+        )
+        self.completed += 1
+        logger.info("Finished cascade deletion of %s %s", job["kind"], job.get("topic_name") or job["hobby_name"])
+
+    async def pending(self) -> List[dict]:
+        return await DeletionJob.get_motor_collection().find(
+            {"status": {"$in": ["pending", "running"]}},
+            {"kind": 1, "hobby_name": 1, "topic_name": 1, "deleted_at": 1, "created_at": 1},
+        ).to_list(None)
+
+    async def jobs(self, limit: int = 50) -> List[dict]:
+        return await DeletionJob.get_motor_collection().find({}).sort("created_at", -1).limit(limit).to_list(None)
+
+    def stats(self) -> dict:
+        return {"completed": self.completed, "failed": self.failed}
@@ -0,0 +1,124 @@
+import asyncio
+import hashlib
+import logging
+from typing import Dict, Optional, Set
+
+from fastapi import Request, Response, status
+from pymongo import ReturnDocument
+from pymongo.errors import PyMongoError
+
+from service.broker import InProcessBroker
+from service.cache import TTLCache
+
+
+logger = logging.getLogger(__name__)
+
+VERSIONS_CHANNEL = "versions"
+EPOCH = "*"
+
+
+class VersionStore:
+    def __init__(self, broker: InProcessBroker, ttl: float, maxsize: int, coalesce_interval: float = 0.0, collection_name: str = "versions"):
+        self.broker = broker
+        self.collection_name = collection_name
+        self.cache = TTLCache(maxsize, ttl)
+        self.coalesce_interval = coalesce_interval
+        self.bumps = 0
+        self.loads = 0
+        self.coalesced = 0
+        self._dirty: Set[str] = set()
+        self._collection = None
+        self._task: Optional[asyncio.Task] = None
+        self._flusher: Optional[asyncio.Task] = None
+
+    async def start(self, database):
+        self._collection = database[self.collection_name]
+        self._task = asyncio.create_task(self._listen())
+        if self.coalesce_interval:
+            self._flusher = asyncio.create_task(self._flush_periodically())
+
+    async def stop(self):
+        for task in (self._flusher, self._task):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._task = self._flusher = None
+        await self.flush()
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.coalesce_interval)
+            await self.flush()
+
+    async def flush(self):
+        if self._dirty:
+            keys, self._dirty = self._dirty, set()
+            await self.bump(*keys)
+
+    async def _listen(self):
+        while True:
+            with self.broker.subscribe(VERSIONS_CHANNEL) as subscription:
+                async for event in subscription:
+                    self.apply(event["versions"])
+            self.cache.clear()
+
+    def apply(self, versions: Dict[str, int]):
+        for key, version in versions.items():
+            if version > self.cache.get(key, -1):
+                self.cache.set(key, version)
+
+    async def get(self, key: str) -> int:
+        version = self.cache.get(key)
+        if version is None:
+            self.loads += 1
+            doc = await self._collection.find_one({"_id": key})
+            version = doc["v"] if doc else 0
+            self.cache.set(key, version)
+        return version
+
+    async def bump(self, *keys: str):
+        try:
+            docs = await asyncio.gather(*(
+                self._collection.find_one_and_update({"_id": key}, {"$inc": {"v": 1}}, upsert=True, return_document=ReturnDocument.AFTER)
+                for key in set(keys)
+            ))
+            versions = {doc["_id"]: doc["v"] for doc in docs}
+            self.bumps += len(versions)
+            self.apply(versions)
+            await self.broker.publish({"type": "version", "versions": versions}, VERSIONS_CHANNEL)
+        except PyMongoError:
+            logger.exception("Could not bump versions for %s", ", ".join(keys))
+            for key in keys:
+                self.cache.pop(key)
+
+    async def touch(self, *keys: str):
+        if not self.coalesce_interval:
+            await self.bump(*keys)
+            return
+        self.coalesced += len(self._dirty.intersection(keys))
+        self._dirty.update(keys)
+
+    async def etag(self, *keys: str, variant: str = "") -> str:
+        versions = await asyncio.gather(*(self.get(key) for key in (EPOCH,) + keys))
+        digest = hashlib.blake2b(f"{keys}|{variant}".encode(), digest_size=8).hexdigest()
+        return '"' + digest + "-" + "-".join(str(version) for version in versions) + '"'
+
+    def stats(self) -> dict:
+        return {"bumps": self.bumps, "coalesced": self.coalesced, "pending": len(self._dirty), "loads": self.loads, **self.cache.stats()}
+
+
+def cache_headers(etag: str, max_age: int) -> dict:
+    return {"ETag": etag, "Cache-Control": f"public, max-age={max_age}, must-revalidate"}
+
+
+def not_modified(request: Request, etag: str, max_age: int) -> Optional[Response]:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return None
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    if "*" in candidates or etag in (candidate[2:] if candidate.startswith("W/") else candidate for candidate in candidates):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers(etag, max_age))
+    return None
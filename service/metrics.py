@@ -0,0 +1,256 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+from fastapi import Request
+from pymongo import monitoring
+
+
+logger = logging.getLogger("metrics.slow_requests")
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _quote(value) -> str:
+    return '"%s"' % value
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = ['%s="%s"' % (name, str(value).replace('"', "'")) for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{_labels(self.labels, key)} {value}" for key, value in self._values.items()]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, *labels: str, value: float):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self._values: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, *labels: str, value: float):
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * len(self.buckets), 0.0, 0]
+            index = bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            for key, (counts, total, count) in self._values.items():
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(f"{self.name}_bucket{_labels(self.labels, key, 'le=%s' % _quote(bound))} {cumulative}")
+                lines.append(f"{self.name}_bucket{_labels(self.labels, key, 'le=%s' % _quote('+Inf'))} {count}")
+                lines.append(f"{self.name}_sum{_labels(self.labels, key)} {total}")
+                lines.append(f"{self.name}_count{_labels(self.labels, key)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        self.collectors: List[Tuple[str, Callable[[], dict]]] = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def register_stats(self, prefix: str, collect: Callable[[], dict]):
+        self.collectors.append((prefix, collect))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        for prefix, collect in self.collectors:
+            for key, value in _flatten(collect()):
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                name = f"{prefix}_{key}"
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _flatten(stats: dict, prefix: str = ""):
+    for key, value in stats.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            yield from _flatten(value, f"{name}_")
+        else:
+            yield name, value
+
+
+registry = Registry()
+http_request_seconds = registry.register(Histogram("http_request_seconds", "HTTP request latency by route", ("method", "route", "status")))
+http_requests_in_flight = registry.register(Gauge("http_requests_in_flight", "HTTP requests currently being served", ("method",)))
+mongo_command_seconds = registry.register(Histogram("mongo_command_seconds", "MongoDB command latency", ("command", "collection")))
+mongo_command_documents = registry.register(Counter("mongo_command_documents_total", "Documents returned or written by MongoDB commands", ("command", "collection")))
+mongo_command_failures = registry.register(Counter("mongo_command_failures_total", "Failed MongoDB commands", ("command", "collection")))
+password_hash_seconds = registry.register(Histogram("password_hash_seconds", "Password hash and verify latency including pool wait", ("operation",)))
+jwt_decode_seconds = registry.register(Histogram("jwt_decode_seconds", "JWT decode latency", buckets=(0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.005)))
+
+
+@dataclass
+class RequestStats:
+    db_seconds: float = 0.0
+    db_commands: Dict[str, list] = field(default_factory=dict)
+    hash_seconds: float = 0.0
+    jwt_seconds: float = 0.0
+
+    def add_command(self, key: str, seconds: float, documents: int):
+        entry = self.db_commands.setdefault(key, [0, 0.0, 0])
+        entry[0] += 1
+        entry[1] += seconds
+        entry[2] += documents
+        self.db_seconds += seconds
+
+
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+
+def record_hash(operation: str, seconds: float):
+    password_hash_seconds.observe(operation, value=seconds)
+    stats = current_request.get()
+    if stats is not None:
+        stats.hash_seconds += seconds
+
+
+def record_jwt(seconds: float):
+    jwt_decode_seconds.observe(value=seconds)
+    stats = current_request.get()
+    if stats is not None:
+        stats.jwt_seconds += seconds
+
+
+def _reply_documents(reply: dict) -> int:
+    cursor = reply.get("cursor")
+    if cursor:
+        return len(cursor.get("firstBatch", cursor.get("nextBatch", [])))
+    if "n" in reply:
+        return int(reply["n"])
+    if reply.get("value") is not None:
+        return 1
+    return 0
+
+
+class CommandMetricsListener(monitoring.CommandListener):
+    def __init__(self):
+        self._pending: Dict[tuple, Tuple[str, str]] = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        if not isinstance(collection, str):
+            collection = event.command.get("collection", "")
+        with self._lock:
+            self._pending[(event.connection_id, event.request_id)] = (event.command_name, collection or "")
+
+    def _finish(self, event) -> Tuple[str, str]:
+        with self._lock:
+            return self._pending.pop((event.connection_id, event.request_id), (event.command_name, ""))
+
+    def succeeded(self, event):
+        command, collection = self._finish(event)
+        seconds = event.duration_micros / 1e6
+        documents = _reply_documents(event.reply)
+        mongo_command_seconds.observe(command, collection, value=seconds)
+        mongo_command_documents.inc(command, collection, amount=documents)
+        stats = current_request.get()
+        if stats is not None:
+            stats.add_command(f"{command}:{collection}", seconds, documents)
+
+    def failed(self, event):
+        command, collection = self._finish(event)
+        seconds = event.duration_micros / 1e6
+        mongo_command_seconds.observe(command, collection, value=seconds)
+        mongo_command_failures.inc(command, collection)
+        stats = current_request.get()
+        if stats is not None:
+            stats.add_command(f"{command}:{collection}", seconds, 0)
+
+
+command_metrics = CommandMetricsListener()
+
+
+class MetricsMiddleware:
+    def __init__(self, slow_request_seconds: float):
+        self.slow_request_seconds = slow_request_seconds
+
+    async def __call__(self, request: Request, call_next):
+        method = request.method
+        stats = RequestStats()
+        token = current_request.set(stats)
+        http_requests_in_flight.inc(method)
+        started = time.perf_counter()
+        status_code = 500
+        try:
+            response = await call_next(request)
+            status_code = response.status_code
+            return response
+        finally:
+            elapsed = time.perf_counter() - started
+            http_requests_in_flight.inc(method, amount=-1)
+            current_request.reset(token)
+            route = request.scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            http_request_seconds.observe(method, route_path, str(status_code), value=elapsed)
+            if elapsed >= self.slow_request_seconds:
+                self.log_slow(method, route_path, request.url.path, status_code, elapsed, stats)
+
+    def log_slow(self, method: str, route: str, path: str, status_code: int, elapsed: float, stats: RequestStats):
+        other = max(elapsed - stats.db_seconds - stats.hash_seconds - stats.jwt_seconds, 0.0)
+        commands = ", ".join(
+            f"{key} x{count} {seconds * 1000:.1f}ms {documents} docs"
+            for key, (count, seconds, documents) in sorted(stats.db_commands.items(), key=lambda item: -item[1][1])
+        )
+        logger.warning(
+            "Slow request %s %s (%s) %s in %.1fms: db %.1fms [%s], hash %.1fms, jwt %.2fms, other %.1fms",
+            method, path, route, status_code, elapsed * 1000, stats.db_seconds * 1000, commands,
+            stats.hash_seconds * 1000, stats.jwt_seconds * 1000, other * 1000,
+        )
@@ -0,0 +1,111 @@
+import asyncio
+import cProfile
+import io
+import itertools
+import marshal
+import pstats
+import random
+import time
+from collections import deque
+from typing import Awaitable, Callable, List, Optional
+
+from fastapi import Request
+
+
+class ProfileStore:
+    def __init__(self, size: int):
+        self._profiles = deque(maxlen=size)
+        self._ids = itertools.count(1)
+
+    def add(self, method: str, path: str, status_code: int, elapsed: float, trigger: str, profiler: cProfile.Profile, overlapping: int = 0) -> int:
+        stats = pstats.Stats(profiler)
+        profile = {
+            "id": next(self._ids),
+            "method": method,
+            "path": path,
+            "status": status_code,
+            "elapsed_ms": elapsed * 1000,
+            "trigger": trigger,
+            "overlapping_requests": overlapping,
+            "captured_at": time.time(),
+            "total_calls": stats.total_calls,
+            "stats": marshal.dumps(stats.stats),
+        }
+        self._profiles.append(profile)
+        return profile["id"]
+
+    def list(self) -> List[dict]:
+        return [{k: v for k, v in profile.items() if k != "stats"} for profile in reversed(self._profiles)]
+
+    def get(self, profile_id: int) -> Optional[dict]:
+        for profile in self._profiles:
+            if profile["id"] == profile_id:
+                return profile
+        return None
+
+
+def profile_as_text(profile: dict, sort: str = "cumulative", limit: int = 60) -> str:
+    stream = io.StringIO()
+    stats = pstats.Stats(stream=stream)
+    stats.stats = marshal.loads(profile["stats"])
+    stats.get_top_level_stats()
+    stats.sort_stats(sort).print_stats(limit)
+    return stream.getvalue()
+
+
+class ProfilingMiddleware:
+    def __init__(self, store: ProfileStore, sample_rate: float, header: str, is_admin: Callable[[Request], Awaitable[bool]]):
+        self.store = store
+        self.sample_rate = sample_rate
+        self.header = header
+        self.is_admin = is_admin
+        self.in_flight = 0
+        self.overlapping = 0
+        self.skipped_busy = 0
+        self._lock = asyncio.Lock()
+
+    async def trigger(self, request: Request) -> Optional[str]:
+        if request.headers.get(self.header) and await self.is_admin(request):
+            return "header"
+        if self.sample_rate and random.random() < self.sample_rate:
+            return "sample"
+        return None
+
+    async def __call__(self, request: Request, call_next):
+        self.in_flight += 1
+        if self._lock.locked():
+            self.overlapping += 1
+        try:
+            return await self.dispatch(request, call_next)
+        finally:
+            self.in_flight -= 1
+
+    # cProfile hooks the event loop thread, so it records every coroutine that
+    # runs while it is enabled. A profile is only started when this is the sole
+    # request in flight, and requests that arrive during it are counted in
+    # overlapping_requests so the capture can be discarded if it was shared.
+    async def dispatch(self, request: Request, call_next):
+        if self._lock.locked():
+            return await call_next(request)
+        trigger = await self.trigger(request)
+        if trigger is None or self._lock.locked():
+            return await call_next(request)
+        if self.in_flight > 1:
+            self.skipped_busy += 1
+            response = await call_next(request)
+            if trigger == "header":
+                response.headers["X-Profile-Skipped"] = "other requests in flight"
+            return response
+
+        async with self._lock:
+            self.overlapping = 0
+            profiler = cProfile.Profile()
+            started = time.perf_counter()
+            profiler.enable()
+            try:
+                response = await call_next(request)
+            finally:
+                profiler.disable()
+            profile_id = self.store.add(request.method, request.url.path, response.status_code, time.perf_counter() - started, trigger, profiler, self.overlapping)
+        response.headers["X-Profile-Id"] = str(profile_id)
+        return response
@@ -0,0 +1,201 @@
+import asyncio
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from beanie import Document
+from bson import ObjectId
+from fastapi import HTTPException, status
+from pydantic import BaseModel
+
+from database.conection import Database
+from database.pagination import decode_cursor, encode_cursor
+from models.hobby import Discussion, Hobby, Topic
+
+
+KINDS = {"hobby": Hobby, "topic": Topic, "comment": Discussion}
+KIND_RANKS = {kind: rank for rank, kind in enumerate(KINDS)}
+TEXT_FIELDS = {
+    "hobby": {"name": 5, "description": 1},
+    "topic": {"name": 5, "description": 1},
+    "comment": {"comment": 1},
+}
+STORED_FIELDS = ("_id", "name", "description", "hobby_name", "topic_name", "comment", "owner", "created_at")
+TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN.findall(text.lower())
+
+
+def to_hit(kind: str, doc: dict, score: float) -> dict:
+    hit = {"kind": kind, "_id": doc["_id"], "score": score}
+    if kind == "hobby":
+        hit.update(hobby_name=doc["name"], title=doc["name"], text=doc.get("description", ""))
+    elif kind == "topic":
+        hit.update(hobby_name=doc.get("hobby_name"), topic_name=doc["name"], title=doc["name"], text=doc.get("description", ""))
+    else:
+        hit.update(hobby_name=doc.get("hobby_name"), topic_name=doc.get("topic_name"), text=doc.get("comment", ""), owner=doc.get("owner"), created_at=doc.get("created_at"))
+    return hit
+
+
+def hit_key(hit: dict) -> tuple:
+    return -hit["score"], KIND_RANKS[hit["kind"]], hit["_id"]
+
+
+def decode_search_cursor(cursor: Optional[str]) -> Optional[Tuple[float, int, ObjectId]]:
+    if not cursor:
+        return None
+    id, value = decode_cursor(cursor)
+    if not (isinstance(value, list) and len(value) == 2 and all(isinstance(part, (int, float)) for part in value)):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    score, rank = value
+    return score, rank, id
+
+
+def page_of(hits: List[dict], limit: int) -> dict:
+    hits.sort(key=hit_key)
+    next_cursor = None
+    if len(hits) > limit:
+        hits = hits[:limit]
+        last = hits[-1]
+        next_cursor = encode_cursor(last["_id"], [last["score"], KIND_RANKS[last["kind"]]])
+    return {"items": hits, "next_cursor": next_cursor}
+
+
+class SearchIndex:
+    async def start(self):
+        pass
+
+    def add(self, kind: str, doc):
+        pass
+
+    def remove(self, kind: str, id: ObjectId):
+        pass
+
+    async def search(self, query: str, scopes: Dict[str, dict], cursor: Optional[str], limit: int) -> dict:
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        return {}
+
+
+class MongoTextSearch(SearchIndex):
+    def keyset(self, kind: str, after: Optional[tuple]) -> dict:
+        if after is None:
+            return {}
+        score, rank, id = after
+        if KIND_RANKS[kind] > rank:
+            return {"score": {"$lte": score}}
+        if KIND_RANKS[kind] < rank:
+            return {"score": {"$lt": score}}
+        return {"$or": [{"score": {"$lt": score}}, {"score": score, "_id": {"$gt": id}}]}
+
+    async def search_kind(self, kind: str, query: str, filters: dict, after: Optional[tuple], limit: int) -> List[dict]:
+        pipeline = [
+            {"$match": {"$text": {"$search": query}, **filters}},
+            {"$addFields": {"score": {"$meta": "textScore"}}},
+            {"$match": self.keyset(kind, after)},
+            {"$sort": {"score": -1, "_id": 1}},
+            {"$limit": limit + 1},
+            {"$project": {field: 1 for field in STORED_FIELDS + ("score",)}},
+        ]
+        docs = await Database(KINDS[kind]).read_collection().aggregate(pipeline).to_list(None)
+        return [to_hit(kind, doc, doc["score"]) for doc in docs]
+
+    async def search(self, query: str, scopes: Dict[str, dict], cursor: Optional[str], limit: int) -> dict:
+        after = decode_search_cursor(cursor)
+        results = await asyncio.gather(*(self.search_kind(kind, query, filters, after, limit) for kind, filters in scopes.items()))
+        return page_of([hit for hits in results for hit in hits], limit)
+
+
+def matches(doc: dict, filters: dict) -> bool:
+    for field, expected in filters.items():
+        if field == "$nor":
+            if any(matches(doc, clause) for clause in expected):
+                return False
+        elif isinstance(expected, dict):
+            value = doc.get(field)
+            for op, operand in expected.items():
+                if op == "$in":
+                    if value not in operand:
+                        return False
+                elif op == "$lte":
+                    if value is None or value > operand:
+                        return False
+                else:
+                    raise ValueError(f"Unsupported operator {op}")
+        elif doc.get(field) != expected:
+            return False
+    return True
+
+
+class InMemorySearch(SearchIndex):
+    def __init__(self):
+        self.documents: Dict[tuple, dict] = {}
+        self.postings: Dict[str, Dict[tuple, float]] = defaultdict(dict)
+        self.terms: Dict[tuple, List[str]] = {}
+
+    async def start(self):
+        self.documents.clear()
+        self.postings.clear()
+        self.terms.clear()
+        for kind, model in KINDS.items():
+            cursor = Database(model).read_collection().find({}, {field: 1 for field in STORED_FIELDS})
+            async for doc in cursor:
+                self.add(kind, doc)
+
+    def add(self, kind: str, doc):
+        if isinstance(doc, BaseModel):
+            doc = doc.model_dump(by_alias=True) if isinstance(doc, Document) else doc.model_dump()
+        key = (kind, doc["_id"])
+        self.remove(kind, doc["_id"])
+        weights = Counter()
+        for field, weight in TEXT_FIELDS[kind].items():
+            for token in tokenize(doc.get(field) or ""):
+                weights[token] += weight
+        for token, weight in weights.items():
+            self.postings[token][key] = weight
+        self.terms[key] = list(weights)
+        self.documents[key] = {field: doc[field] for field in STORED_FIELDS if field in doc}
+
+    def remove(self, kind: str, id: ObjectId):
+        key = (kind, id)
+        for token in self.terms.pop(key, ()):
+            postings = self.postings.get(token)
+            if postings is not None:
+                postings.pop(key, None)
+                if not postings:
+                    del self.postings[token]
+        self.documents.pop(key, None)
+
+    async def search(self, query: str, scopes: Dict[str, dict], cursor: Optional[str], limit: int) -> dict:
+        after = decode_search_cursor(cursor)
+        scores: Dict[tuple, float] = defaultdict(float)
+        total = len(self.documents) or 1
+        for token in set(tokenize(query)):
+            postings = self.postings.get(token, {})
+            idf = math.log(1 + total / (1 + len(postings)))
+            for key, weight in postings.items():
+                if key[0] in scopes:
+                    scores[key] += weight * idf
+        hits = []
+        for (kind, id), score in scores.items():
+            doc = self.documents[(kind, id)]
+            if not matches(doc, scopes[kind]):
+                continue
+            hit = to_hit(kind, doc, score)
+            if after is not None and hit_key(hit) <= (-after[0], after[1], after[2]):
+                continue
+            hits.append(hit)
+        return page_of(hits, limit)
+
+    def stats(self) -> dict:
+        return {"documents": len(self.documents), "terms": len(self.postings)}
+
+
+def create_search_index(backend: str) -> SearchIndex:
+    if backend == "memory":
+        return InMemorySearch()
+    return MongoTextSearch()
@@ -0,0 +1,55 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from fastapi import HTTPException, status
+
+
+class SingleFlight:
+    def __init__(self, max_waiters: int = 1000):
+        self.max_waiters = max_waiters
+        self.calls = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self.waiters_max = 0
+        self._flights: Dict[Hashable, asyncio.Task] = {}
+        self._waiters: Dict[Hashable, int] = {}
+
+    def _finish(self, key: Hashable, task: asyncio.Task):
+        if self._flights.get(key) is task:
+            del self._flights[key]
+        if not task.cancelled():
+            task.exception()
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._flights.get(key)
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(fn())
+            self._flights[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        elif self._waiters.get(key, 0) >= self.max_waiters:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many concurrent requests for this resource, retry later",
+                headers={"Retry-After": "1"},
+            )
+        else:
+            self.coalesced += 1
+        waiters = self._waiters[key] = self._waiters.get(key, 0) + 1
+        self.waiters_max = max(self.waiters_max, waiters)
+        try:
+            return await asyncio.shield(task)
+        finally:
+            self._waiters[key] -= 1
+            if not self._waiters[key]:
+                del self._waiters[key]
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._flights),
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "rejected": self.rejected,
+            "waiters_max": self.waiters_max,
+        }
@@ -0,0 +1,50 @@
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+class StartupTimer:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.ready = False
+        self.ready_seconds: Optional[float] = None
+
+    def record(self, name: str):
+        self.phases[name] = time.perf_counter() - self.started
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - started
+
+    def mark_ready(self):
+        self.ready_seconds = time.perf_counter() - self.started
+        self.ready = True
+        logger.info(
+            "Worker %d ready in %.3fs (%s)",
+            os.getpid(),
+            self.ready_seconds,
+            ", ".join(f"{name} {seconds:.3f}s" for name, seconds in self.phases.items()),
+        )
+
+    def report(self) -> dict:
+        return {"pid": os.getpid(), "ready": self.ready, "ready_seconds": self.ready_seconds, "phases": dict(self.phases)}
+
+    def stats(self) -> dict:
+        return {
+            "ready": int(self.ready),
+            "ready_seconds": self.ready_seconds or 0.0,
+            **{f"{name}_seconds": seconds for name, seconds in self.phases.items()},
+        }
+
+
+startup = StartupTimer()
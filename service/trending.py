@@ -0,0 +1,165 @@
+import asyncio
+import heapq
+import logging
+import math
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from operator import itemgetter
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import ASCENDING, UpdateOne
+from pymongo.errors import PyMongoError
+
+
+logger = logging.getLogger(__name__)
+
+
+class SlidingWindow:
+    def __init__(self, window: float, bucket_seconds: float, max_keys: int):
+        self.bucket_seconds = bucket_seconds
+        self.size = max(math.ceil(window / bucket_seconds), 1)
+        self.max_keys = max_keys
+        self.dropped = 0
+        self.totals: Counter = Counter()
+        self._buckets: List[Tuple[int, Counter]] = [(-1, Counter()) for _ in range(self.size)]
+
+    def bucket_of(self, now: float) -> int:
+        return int(now // self.bucket_seconds)
+
+    def _slot(self, bucket: int) -> Counter:
+        index = bucket % self.size
+        current, counts = self._buckets[index]
+        if current != bucket:
+            self.totals.subtract(counts)
+            self.totals = +self.totals
+            counts = Counter()
+            self._buckets[index] = (bucket, counts)
+        return counts
+
+    def add(self, key: str, amount: int, now: float) -> bool:
+        counts = self._slot(self.bucket_of(now))
+        if key not in counts and len(counts) >= self.max_keys:
+            self.dropped += 1
+            return False
+        counts[key] += amount
+        self.totals[key] += amount
+        return True
+
+    def advance(self, now: float):
+        oldest = self.bucket_of(now) - self.size
+        for index, (bucket, counts) in enumerate(self._buckets):
+            if 0 <= bucket <= oldest:
+                self.totals.subtract(counts)
+                self._buckets[index] = (-1, Counter())
+        self.totals = +self.totals
+
+    def top(self, k: int) -> List[Tuple[str, int]]:
+        return heapq.nlargest(k, self.totals.items(), key=itemgetter(1))
+
+
+class TrendingCounters:
+    def __init__(self, window: float, bucket_seconds: float, top_k: int, max_keys: int, sync_interval: float, kinds=("hobby", "topic")):
+        self.window = window
+        self.top_k = top_k
+        self.sync_interval = sync_interval
+        self.windows = {kind: SlidingWindow(window, bucket_seconds, max_keys) for kind in kinds}
+        self.syncs = 0
+        self.sync_failures = 0
+        self.updated_at: Optional[datetime] = None
+        self._pending: Dict[Tuple[str, int, str], int] = defaultdict(int)
+        self._top: Dict[str, List[Tuple[str, int]]] = {kind: [] for kind in kinds}
+        self._collection = None
+        self._task: Optional[asyncio.Task] = None
+
+    def record(self, kind: str, key: str, amount: int = 1):
+        window = self.windows[kind]
+        now = time.time()
+        if window.add(key, amount, now) and self._collection is not None:
+            self._pending[(kind, window.bucket_of(now), key)] += amount
+
+    async def start(self, database=None):
+        if database is not None:
+            self._collection = database["trending"]
+            await self._collection.create_index([("kind", ASCENDING), ("bucket", ASCENDING)], name="kind_bucket")
+            await self._collection.create_index("expires_at", name="expires_at_ttl", expireAfterSeconds=0)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._collection is not None:
+            try:
+                await self.flush()
+            except PyMongoError:
+                logger.exception("Could not persist trending counters on shutdown")
+
+    async def _run(self):
+        while True:
+            try:
+                await self.sync()
+            except PyMongoError:
+                self.sync_failures += 1
+                logger.exception("Trending counter sync failed")
+            await asyncio.sleep(self.sync_interval)
+
+    async def flush(self):
+        pending, self._pending = self._pending, defaultdict(int)
+        if not pending:
+            return
+        expires_at = datetime.now() + timedelta(seconds=self.window * 2)
+        requests = [
+            UpdateOne(
+                {"_id": f"{kind}|{bucket}|{key}"},
+                {"$inc": {"count": count}, "$setOnInsert": {"kind": kind, "bucket": bucket, "key": key, "expires_at": expires_at}},
+                upsert=True,
+            )
+            for (kind, bucket, key), count in pending.items()
+        ]
+        try:
+            await self._collection.bulk_write(requests, ordered=False)
+        except PyMongoError:
+            for key, count in pending.items():
+                self._pending[key] += count
+            raise
+
+    async def merged_top(self, kind: str) -> List[Tuple[str, int]]:
+        window = self.windows[kind]
+        oldest = window.bucket_of(time.time()) - window.size
+        docs = await self._collection.aggregate([
+            {"$match": {"kind": kind, "bucket": {"$gt": oldest}}},
+            {"$group": {"_id": "$key", "count": {"$sum": "$count"}}},
+            {"$sort": {"count": -1}},
+            {"$limit": self.top_k},
+        ]).to_list(None)
+        return [(doc["_id"], doc["count"]) for doc in docs]
+
+    async def sync(self):
+        now = time.time()
+        for window in self.windows.values():
+            window.advance(now)
+        if self._collection is None:
+            top = {kind: window.top(self.top_k) for kind, window in self.windows.items()}
+        else:
+            await self.flush()
+            top = {kind: await self.merged_top(kind) for kind in self.windows}
+        self._top = top
+        self.syncs += 1
+        self.updated_at = datetime.now()
+
+    def top(self, kind: str, k: int) -> List[Tuple[str, int]]:
+        return self._top[kind][:k]
+
+    def stats(self) -> dict:
+        return {
+            "syncs": self.syncs,
+            "sync_failures": self.sync_failures,
+            "pending": len(self._pending),
+            **{f"{kind}_keys": len(window.totals) for kind, window in self.windows.items()},
+            **{f"{kind}_dropped": window.dropped for kind, window in self.windows.items()},
+        }
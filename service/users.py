@@ -1,19 +1,26 @@
 import time
 from datetime import datetime
-from passlib.context import CryptContext
-from database.conection import Settings
+from typing import Optional
+from database.conection import get_settings
+from service.cache import CacheSync, TTLCache
+from service.hashing import HashingService
+from service.metrics import record_hash, record_jwt
 
-from fastapi import HTTPException, status, Depends
+from fastapi import HTTPException, Request, status, Depends
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 from models.users import Role, User
 
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/user/signin")
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-settings = Settings()
+settings = get_settings()
 ALGORITHM = "HS256"
 TOKEN_EXPIRES = 1500
+USERS_CHANNEL = "users"
+
+token_cache = TTLCache(settings.USER_CACHE_SIZE, settings.USER_CACHE_TTL)
+user_cache = TTLCache(settings.USER_CACHE_SIZE, settings.USER_CACHE_TTL)
+hashing_service = HashingService(settings.HASH_WORKERS, settings.HASH_MAX_PENDING)
 
 
 def create_access_token(user: str) -> str:
@@ -25,15 +32,45 @@ def create_access_token(user: str) -> str:
     token = jwt.encode(payload, settings.SECRET_KEY, algorithm=ALGORITHM)
     return token
 
+def decode_access_token(token: str) -> dict:
+    data = token_cache.get(token)
+    if data is None:
+        started = time.perf_counter()
+        data = jwt.decode(token, settings.SECRET_KEY, algorithms=ALGORITHM)
+        record_jwt(time.perf_counter() - started)
+        token_cache.set(token, data)
+    return data
+
+
+async def get_user_by_email(email: str) -> Optional[User]:
+    user = user_cache.get(email)
+    if user is None:
+        user = await User.find_one(User.email == email)
+        if user:
+            user_cache.set(email, user)
+    return user
+
+
+user_sync = CacheSync(user_cache, USERS_CHANNEL)
+
+
+async def invalidate_user(*emails: str):
+    await user_sync.invalidate(*emails)
+
+
+def cache_stats() -> dict:
+    return {"tokens": token_cache.stats(), "users": user_cache.stats(), "invalidations": user_sync.stats()}
+
+
 async def verify_access_token(token:str) -> dict:
     try:
-        data = jwt.decode(token, settings.SECRET_KEY, algorithms=ALGORITHM)
+        data = decode_access_token(token)
         expire = data.get("expires")
         if expire is None:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No access token supplied")
         if datetime.now() > datetime.fromtimestamp(expire):
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Token expired")
-        user_exist = await User.find_one(User.email==data["user"])
+        user_exist = await get_user_by_email(data["user"])
         if not user_exist:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No user found")
         return data
@@ -42,13 +79,33 @@ async def verify_access_token(token:str) -> dict:
     
     
 class HashPassword:
-    def create_hash(self, password:str):
-        return pwd_context.hash(password)
+    async def create_hash(self, password:str):
+        started = time.perf_counter()
+        try:
+            return await hashing_service.create_hash(password)
+        finally:
+            record_hash("hash", time.perf_counter() - started)
     
-    def verify_hash(self, plain_password:str, hashed_password:str):
-        return pwd_context.verify(plain_password, hashed_password)
+    async def verify_hash(self, plain_password:str, hashed_password:str):
+        started = time.perf_counter()
+        try:
+            return await hashing_service.verify_hash(plain_password, hashed_password)
+        finally:
+            record_hash("verify", time.perf_counter() - started)
     
 
+async def is_admin_request(request: Request) -> bool:
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    try:
+        payload = decode_access_token(token)
+    except JWTError:
+        return False
+    user = await get_user_by_email(payload.get("user"))
+    return user is not None and user.role == Role.admin
+
+
 async def authenticate(token:str=Depends(oauth2_scheme)) -> str:
     if not token:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Signin to get access")
@@ -56,7 +113,10 @@ async def authenticate(token:str=Depends(oauth2_scheme)) -> str:
     return decoded_token["user"]
 
 
-async def promote_to_moderator(user: User, hobby_name: str):
-    user.role = Role.moderator
-    user.moderated_hobbies.append(hobby_name)
-    await user.save()
\ No newline at end of file
+async def promote_to_moderator(email: str, hobby_name: str) -> bool:
+    result = await User.get_motor_collection().update_one(
+        {"email": email},
+        {"$set": {"role": Role.moderator.value}, "$addToSet": {"moderated_hobbies": hobby_name}},
+    )
+    await invalidate_user(email)
+    return bool(result.matched_count)
\ No newline at end of file
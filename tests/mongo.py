@@ -0,0 +1,11 @@
+from benchmarks.standin import mongomock_client
+from database.conection import get_settings, use_client
+
+
+async def fresh_database(name: str = "tests"):
+    client = mongomock_client()
+    use_client(client)
+    settings = get_settings()
+    settings.DATABASE_NAME = name
+    await settings.initialize_database()
+    return client[name]
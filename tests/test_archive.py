@@ -0,0 +1,60 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from data.hobby import archiver, list_comments
+from models.hobby import Discussion, DiscussionArchive, Hobby, Topic
+from tests.mongo import fresh_database
+
+
+async def fresh_archive():
+    database = await fresh_database()
+    archiver._leases = database["archive_runs"]
+
+
+async def thread(hobby_names: list, ages: dict):
+    await Hobby(name="climbing", description="", owner="a@example.com").insert()
+    for hobby_name in hobby_names:
+        await Topic(name="gear", description="", hobby_name=hobby_name, owner="a@example.com").insert()
+    now = datetime.now()
+    comments = {}
+    for text, (days, hobby_name) in ages.items():
+        comment = Discussion(comment=text, topic_name="gear", hobby_name=hobby_name, owner="a@example.com", created_at=now - timedelta(days=days))
+        await comment.insert()
+        comments[text] = comment
+    return now, comments
+
+
+async def newest_first(limit: int) -> list:
+    texts, cursor = [], None
+    while True:
+        page = await list_comments("climbing", "gear", cursor=cursor, limit=limit)
+        texts.extend(item["comment"] for item in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return texts
+
+
+def test_legacy_comments_are_archived_when_the_topic_name_is_unique():
+    async def scenario():
+        await fresh_archive()
+        now, _ = await thread(["climbing"], {"legacy": (200, None), "old": (150, "climbing"), "recent": (1, "climbing")})
+        buckets, archived = await archiver.archive_topic("climbing", "gear", now - timedelta(days=90))
+        assert (buckets, archived) == (1, 2)
+        assert await Discussion.get_motor_collection().count_documents({}) == 1
+        assert await DiscussionArchive.get_motor_collection().count_documents({}) == 1
+        assert await newest_first(1) == ["recent", "old", "legacy"]
+
+    asyncio.run(scenario())
+
+
+def test_hot_legacy_comments_merge_with_the_archive_in_order():
+    async def scenario():
+        await fresh_archive()
+        now, _ = await thread(["climbing", "sailing"], {"legacy": (200, None), "old": (150, "climbing"), "older": (170, "climbing"), "recent": (1, "climbing")})
+        buckets, archived = await archiver.archive_topic("climbing", "gear", now - timedelta(days=90))
+        assert (buckets, archived) == (1, 2)
+        assert await Discussion.get_motor_collection().count_documents({"hobby_name": None}) == 1
+        for limit in (1, 2, 10):
+            assert await newest_first(limit) == ["recent", "old", "older", "legacy"]
+
+    asyncio.run(scenario())
@@ -0,0 +1,72 @@
+import asyncio
+
+from service.batching import GroupCommit
+
+
+def recorder(fail=None):
+    batches = []
+
+    async def flush(items):
+        batches.append(list(items))
+        if fail is not None:
+            raise fail
+        return [item * 2 if item >= 0 else ValueError(item) for item in items]
+
+    return batches, flush
+
+
+def test_submissions_within_the_window_share_a_flush():
+    async def scenario():
+        batches, flush = recorder()
+        batcher = GroupCommit(flush, window=0.01, max_size=100)
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(5)))
+        assert results == [0, 2, 4, 6, 8]
+        assert batches == [[0, 1, 2, 3, 4]]
+
+    asyncio.run(scenario())
+
+
+def test_a_full_batch_flushes_without_waiting_for_the_window():
+    async def scenario():
+        batches, flush = recorder()
+        batcher = GroupCommit(flush, window=60, max_size=3)
+        results = await asyncio.wait_for(asyncio.gather(*(batcher.submit(i) for i in range(3))), 1)
+        assert results == [0, 2, 4]
+        assert batches == [[0, 1, 2]]
+
+    asyncio.run(scenario())
+
+
+def test_per_item_errors_reach_only_their_submitter():
+    async def scenario():
+        _, flush = recorder()
+        batcher = GroupCommit(flush, window=0.01, max_size=100)
+        results = await asyncio.gather(batcher.submit(1), batcher.submit(-1), return_exceptions=True)
+        assert results[0] == 2
+        assert isinstance(results[1], ValueError)
+
+    asyncio.run(scenario())
+
+
+def test_a_failed_flush_fails_every_item_in_the_batch():
+    async def scenario():
+        _, flush = recorder(RuntimeError("write failed"))
+        batcher = GroupCommit(flush, window=0.01, max_size=100)
+        results = await asyncio.gather(batcher.submit(1), batcher.submit(2), return_exceptions=True)
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert batcher.stats()["failed_batches"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_close_flushes_pending_items():
+    async def scenario():
+        batches, flush = recorder()
+        batcher = GroupCommit(flush, window=60, max_size=100)
+        pending = asyncio.ensure_future(batcher.submit(7))
+        await asyncio.sleep(0)
+        await batcher.close()
+        assert await pending == 14
+        assert batches == [[7]]
+
+    asyncio.run(scenario())
@@ -0,0 +1,54 @@
+import asyncio
+
+from mongomock_motor import AsyncMongoMockClient
+
+from service.broker import InProcessBroker, MongoBroker, hobby_channel, topic_channel
+
+
+def test_subscribers_only_receive_their_channels():
+    async def scenario():
+        broker = InProcessBroker()
+        with broker.subscribe(hobby_channel("climbing")) as hobby, broker.subscribe(topic_channel("climbing", "gear")) as topic:
+            await broker.publish({"type": "topic"}, hobby_channel("climbing"))
+            await broker.publish({"type": "comment"}, hobby_channel("climbing"), topic_channel("climbing", "gear"))
+            assert await hobby.get(1) == {"type": "topic"}
+            assert await hobby.get(1) == {"type": "comment"}
+            assert await topic.get(1) == {"type": "comment"}
+            assert topic.queue.empty()
+        assert broker.stats()["subscribers"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_slow_consumers_are_disconnected():
+    async def scenario():
+        broker = InProcessBroker(queue_size=2)
+        subscription = broker.subscribe("feed")
+        for number in range(3):
+            await broker.publish({"n": number}, "feed")
+        assert subscription.closed_reason == "slow consumer"
+        assert [event async for event in subscription] == []
+        assert broker.stats()["dropped"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_mongo_broker_delivers_each_event_once_per_worker():
+    async def scenario():
+        database = AsyncMongoMockClient()["broker"]
+        await database.create_collection("feed_events")
+        local, remote = MongoBroker(), MongoBroker()
+        await local.start(database)
+        await remote.start(database)
+        await asyncio.sleep(0.1)
+        with local.subscribe("feed") as mine, remote.subscribe("feed") as theirs:
+            await local.publish({"n": 1}, "feed")
+            assert await mine.get(1) == {"n": 1}
+            assert await theirs.get(2) == {"n": 1}
+            await asyncio.sleep(0.7)
+            assert mine.queue.empty()
+            assert theirs.queue.empty()
+        await local.stop()
+        await remote.stop()
+
+    asyncio.run(scenario())
@@ -0,0 +1,89 @@
+import asyncio
+
+from models.hobby import Hobby
+from service.broker import InProcessBroker
+from service.cache import ReadThroughCache
+
+
+def lookup_cache():
+    return ReadThroughCache(Hobby, maxsize=10, ttl=60, negative_ttl=60)
+
+
+def loader(calls: list, value):
+    async def load():
+        calls.append(1)
+        return value
+    return load
+
+
+def test_hits_skip_the_loader():
+    async def scenario():
+        cache, calls = lookup_cache(), []
+        assert await cache.get("climbing", loader(calls, "doc")) == "doc"
+        assert await cache.get("climbing", loader(calls, "other")) == "doc"
+        assert len(calls) == 1
+        assert cache.stats()["hits"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_misses_are_cached_as_negatives():
+    async def scenario():
+        cache, calls = lookup_cache(), []
+        assert await cache.get("missing", loader(calls, None)) is None
+        assert await cache.get("missing", loader(calls, "late")) is None
+        assert len(calls) == 1
+
+    asyncio.run(scenario())
+
+
+def test_invalidate_forces_a_reload():
+    async def scenario():
+        cache, calls = lookup_cache(), []
+        await cache.get("climbing", loader(calls, "old"))
+        await cache.invalidate("climbing")
+        assert await cache.get("climbing", loader(calls, "new")) == "new"
+        assert len(calls) == 2
+
+    asyncio.run(scenario())
+
+
+def test_load_racing_an_invalidation_is_not_cached():
+    async def scenario():
+        cache = lookup_cache()
+
+        async def slow_load():
+            await cache.invalidate("climbing")
+            return "stale"
+
+        assert await cache.get("climbing", slow_load) == "stale"
+        assert await cache.get("climbing", loader([], "fresh")) == "fresh"
+
+    asyncio.run(scenario())
+
+
+def test_invalidations_and_puts_reach_other_workers():
+    async def scenario():
+        broker = InProcessBroker()
+        local, remote = lookup_cache(), lookup_cache()
+        await local.start(broker)
+        await remote.start(broker)
+        await asyncio.sleep(0)
+        await local.get("climbing", loader([], "doc"))
+        await remote.get("climbing", loader([], "doc"))
+        await remote.get("sailing", loader([], None))
+
+        await local.invalidate("climbing")
+        await local.put("sailing", "created")
+        await asyncio.sleep(0)
+
+        assert local.local.get("sailing") == "created"
+        assert remote.local.get("climbing") is None
+        assert remote.local.get("sailing") is None
+        assert await remote.get("sailing", loader([], "created")) == "created"
+        assert remote.stats()["received"] == 2
+        assert local.stats()["received"] == 0
+        await local.stop()
+        await remote.stop()
+
+    asyncio.run(scenario())
@@ -0,0 +1,78 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from mongomock_motor import AsyncMongoMockClient
+
+from service.counters import CounterReconciler
+
+
+def workers(count: int, interval=None):
+    leases, calls = AsyncMongoMockClient()["tests"]["reconcile_runs"], []
+
+    async def reconcile():
+        calls.append(datetime.now())
+        await asyncio.sleep(0)
+        return {"elapsed_s": 0.0}
+
+    reconcilers = [CounterReconciler(reconcile, interval) for _ in range(count)]
+    for reconciler in reconcilers:
+        reconciler._leases = leases
+    return reconcilers, calls, leases
+
+
+def test_only_one_worker_runs_concurrently():
+    async def scenario():
+        reconcilers, calls, _ = workers(3)
+        results = await asyncio.gather(*(reconciler.run() for reconciler in reconcilers))
+        assert len(calls) == 1
+        assert sum("skipped" in result for result in results) == 2
+        assert "skipped" not in await reconcilers[1].run()
+
+    asyncio.run(scenario())
+
+
+def test_scheduled_runs_wait_for_the_interval():
+    async def scenario():
+        reconcilers, calls, leases = workers(3, interval=60)
+        for reconciler in reconcilers:
+            await reconciler.run(scheduled=True)
+        assert len(calls) == 1
+        await reconcilers[0].run()
+        assert len(calls) == 2
+        await leases.update_one({"_id": "lease"}, {"$set": {"due": datetime.now() - timedelta(seconds=1)}})
+        await reconcilers[2].run(scheduled=True)
+        assert len(calls) == 3
+
+    asyncio.run(scenario())
+
+
+def test_an_expired_lease_is_not_released_by_its_old_holder():
+    async def scenario():
+        leases = AsyncMongoMockClient()["tests"]["reconcile_runs"]
+        started, finish = asyncio.Event(), asyncio.Event()
+
+        async def slow_reconcile():
+            fast_run.append(asyncio.create_task(fast.run()))
+            await started.wait()
+            return {}
+
+        async def fast_reconcile():
+            started.set()
+            await finish.wait()
+            return {}
+
+        fast_run = []
+        slow = CounterReconciler(slow_reconcile, lease_seconds=0)
+        fast = CounterReconciler(fast_reconcile)
+        late = CounterReconciler(fast_reconcile)
+        for reconciler in (slow, fast, late):
+            reconciler._leases = leases
+
+        await slow.run()
+        assert (await leases.find_one({"_id": "lease"}))["until"] is not None
+        assert "skipped" in await late.run()
+        finish.set()
+        assert "skipped" not in await fast_run[0]
+        assert (await leases.find_one({"_id": "lease"}))["until"] is None
+
+    asyncio.run(scenario())
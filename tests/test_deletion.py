@@ -0,0 +1,56 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from database.conection import Database, tombstone
+from models.hobby import Discussion, Hobby, Topic
+from models.jobs import DeletionJob
+from service.deletion import CascadeDeleter
+from tests.mongo import fresh_database
+
+
+async def seed(hobby_name: str, topic_name: str, created_at: datetime):
+    hobby = Hobby(name=hobby_name, description="", owner="a@example.com")
+    topic = Topic(name=topic_name, description="", hobby_name=hobby_name, owner="a@example.com")
+    comment = Discussion(comment="hello", topic_name=topic_name, hobby_name=hobby_name, owner="a@example.com", created_at=created_at)
+    await hobby.insert()
+    await topic.insert()
+    await comment.insert()
+    return hobby, topic, comment
+
+
+def test_deleted_names_can_be_reused_and_cascade_spares_the_new_hobby():
+    async def scenario():
+        await fresh_database()
+        deleted_at = datetime.now()
+        old_hobby, old_topic, old_comment = await seed("climbing", "gear", deleted_at - timedelta(minutes=5))
+        assert await Database(Hobby).mark_deleted({"name": "climbing"}, deleted_at)
+        await Topic.get_motor_collection().update_many({"hobby_name": "climbing", "deleted_at": None}, tombstone(deleted_at))
+
+        new_hobby, new_topic, new_comment = await seed("climbing", "gear", deleted_at + timedelta(seconds=1))
+
+        deleter = CascadeDeleter(batch_size=10, pause=0, lease_seconds=60, poll_interval=1)
+        job = await deleter.enqueue("hobby", "climbing", old_hobby.id, deleted_at=deleted_at)
+        await deleter.process(await DeletionJob.get_motor_collection().find_one({"_id": job.id}))
+
+        assert await Hobby.get(old_hobby.id) is None
+        assert await Topic.get(old_topic.id) is None
+        assert await Discussion.get(old_comment.id) is None
+        assert await Hobby.get(new_hobby.id) is not None
+        assert await Topic.get(new_topic.id) is not None
+        assert await Discussion.get(new_comment.id) is not None
+
+    asyncio.run(scenario())
+
+
+def test_tombstone_keeps_the_original_name():
+    async def scenario():
+        await fresh_database()
+        hobby, _, _ = await seed("sailing", "knots", datetime.now())
+        before = await Database(Hobby).mark_deleted({"name": "sailing"}, datetime.now())
+        assert before["name"] == "sailing"
+        stored = await Hobby.get_motor_collection().find_one({"_id": hobby.id})
+        assert stored["deleted_name"] == "sailing"
+        assert stored["name"] != "sailing"
+        assert await Database(Hobby).mark_deleted({"name": "sailing"}, datetime.now()) is None
+
+    asyncio.run(scenario())
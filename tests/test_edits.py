@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from data.hobby import edit_comment, edit_topic, hobby_cache, topic_cache, versions
+from models.hobby import Discussion, DiscussionCreate, Hobby, Topic, TopicCreate
+from models.users import User
+from tests.mongo import fresh_database
+
+
+OWNER = "a@example.com"
+
+
+async def forum():
+    database = await fresh_database()
+    hobby_cache.local.clear()
+    topic_cache.local.clear()
+    await versions.start(database)
+    for hobby_name, topic_name in (("climbing", "gear"), ("sailing", "knots"), ("sailing", "gear")):
+        if not await Hobby.find_one({"name": hobby_name}):
+            await Hobby(name=hobby_name, description="", owner=OWNER).insert()
+        await Topic(name=topic_name, description="", hobby_name=hobby_name, owner=OWNER).insert()
+    comment = Discussion(comment="hello", topic_name="gear", hobby_name="climbing", owner=OWNER)
+    elsewhere = Discussion(comment="ahoy", topic_name="gear", hobby_name="sailing", owner=OWNER)
+    await comment.insert()
+    await elsewhere.insert()
+    return User(email=OWNER, password="x"), comment, elsewhere
+
+
+def run(scenario):
+    async def wrapped():
+        try:
+            await scenario()
+        finally:
+            await versions.stop()
+
+    asyncio.run(wrapped())
+
+
+def test_topic_edit_cannot_move_the_topic_to_another_hobby():
+    async def scenario():
+        owner, _, _ = await forum()
+        await edit_topic("climbing", "gear", TopicCreate(name="gear", description="ropes", hobby_name="sailing"), owner)
+        topics = await Topic.find({"name": "gear"}).to_list()
+        assert sorted(topic.hobby_name for topic in topics) == ["climbing", "sailing"]
+        assert (await Topic.find_one({"hobby_name": "climbing", "name": "gear"})).description == "ropes"
+
+    run(scenario)
+
+
+def test_comment_edit_cannot_move_the_comment_to_another_topic():
+    async def scenario():
+        owner, comment, _ = await forum()
+        await edit_comment("climbing", "gear", str(comment.id), DiscussionCreate(comment="edited", topic_name="knots"), owner)
+        stored = await Discussion.get(comment.id)
+        assert (stored.comment, stored.topic_name, stored.hobby_name) == ("edited", "gear", "climbing")
+
+    run(scenario)
+
+
+def test_comment_edit_is_scoped_to_the_hobby_in_the_path():
+    async def scenario():
+        owner, _, elsewhere = await forum()
+        with pytest.raises(HTTPException) as error:
+            await edit_comment("climbing", "gear", str(elsewhere.id), DiscussionCreate(comment="edited", topic_name="gear"), owner)
+        assert error.value.status_code == 400
+        assert (await Discussion.get(elsewhere.id)).comment == "ahoy"
+
+    run(scenario)
@@ -0,0 +1,33 @@
+import asyncio
+
+from mongomock_motor import AsyncMongoMockClient
+
+from service.broker import InProcessBroker
+from service.etags import VersionStore
+
+
+def test_touches_coalesce_into_one_bump_per_interval():
+    async def scenario():
+        versions = VersionStore(InProcessBroker(), ttl=60, maxsize=100, coalesce_interval=60)
+        await versions.start(AsyncMongoMockClient()["tests"])
+        before = await versions.etag("hobbies")
+        for _ in range(50):
+            await versions.touch("hobbies")
+        assert await versions.etag("hobbies") == before
+        await versions.flush()
+        assert await versions.get("hobbies") == 1
+        assert versions.stats()["coalesced"] == 49
+        await versions.stop()
+
+    asyncio.run(scenario())
+
+
+def test_touch_bumps_immediately_without_an_interval():
+    async def scenario():
+        versions = VersionStore(InProcessBroker(), ttl=60, maxsize=100)
+        await versions.start(AsyncMongoMockClient()["tests"])
+        await versions.touch("hobbies")
+        assert await versions.get("hobbies") == 1
+        await versions.stop()
+
+    asyncio.run(scenario())
@@ -0,0 +1,31 @@
+import asyncio
+import os
+
+from service.hashing import HashingService
+
+
+def _crash():
+    os._exit(1)
+
+
+def _echo(value):
+    return value, 0.0
+
+
+def test_broken_pool_is_rebuilt_and_call_retried():
+    async def scenario():
+        service = HashingService(max_workers=1)
+        try:
+            loop = asyncio.get_running_loop()
+            try:
+                await loop.run_in_executor(service._get_executor(), _crash)
+            except Exception:
+                pass
+            assert await service._run(_echo, "hashed") == "hashed"
+            assert service.restarts == 1
+            assert await service._run(_echo, "again") == "again"
+            assert service.restarts == 1
+        finally:
+            service.shutdown()
+
+    asyncio.run(scenario())
@@ -0,0 +1,31 @@
+import asyncio
+
+from database.conection import DOCUMENT_MODELS, get_settings
+from database.indexes import prune_undeclared_indexes
+from models.hobby import Hobby, Topic
+from tests.mongo import fresh_database
+
+
+def test_startup_keeps_indexes_it_did_not_declare():
+    async def scenario():
+        await fresh_database()
+        await Topic.get_motor_collection().create_index("owner", name="dba_owner")
+        await get_settings().initialize_database()
+        names = [index["name"] async for index in Topic.get_motor_collection().list_indexes()]
+        assert "dba_owner" in names
+
+    asyncio.run(scenario())
+
+
+def test_pruning_reports_before_it_drops():
+    async def scenario():
+        await fresh_database()
+        await Topic.get_motor_collection().create_index("owner", name="dba_owner")
+        report = await prune_undeclared_indexes(DOCUMENT_MODELS)
+        assert report == [{"collection": Topic.get_collection_name(), "index": "dba_owner", "key": {"owner": 1}, "dropped": False}]
+        assert await prune_undeclared_indexes(DOCUMENT_MODELS, dry_run=False) == [dict(report[0], dropped=True)]
+        assert await prune_undeclared_indexes(DOCUMENT_MODELS) == []
+        names = [index["name"] async for index in Hobby.get_motor_collection().list_indexes()]
+        assert "name_unique" in names
+
+    asyncio.run(scenario())
@@ -0,0 +1,63 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+
+from database.pagination import decode_cursor, encode_cursor, keyset_filter, keyset_sort, merge_filters, next_cursor_for
+
+
+def test_id_cursor_round_trip():
+    id = ObjectId()
+    assert decode_cursor(encode_cursor(id)) == (id, None)
+
+
+def test_datetime_cursor_round_trip():
+    id, created_at = ObjectId(), datetime(2024, 5, 1, 12, 30, 15, 123000)
+    assert decode_cursor(encode_cursor(id, created_at)) == (id, created_at)
+
+
+def test_value_cursor_round_trip():
+    id = ObjectId()
+    assert decode_cursor(encode_cursor(id, [1.5, 2])) == (id, [1.5, 2])
+
+
+def test_cursor_is_url_safe():
+    cursor = encode_cursor(ObjectId(), "a/b+c?")
+    assert not set(cursor) & set("+/=")
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "e30", encode_cursor(ObjectId())[:-3]])
+def test_invalid_cursor_is_a_bad_request(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor)
+    assert error.value.status_code == 400
+
+
+def test_keyset_filter_on_id():
+    id = ObjectId()
+    assert keyset_filter(None) == {}
+    assert keyset_filter(encode_cursor(id)) == {"_id": {"$gt": id}}
+    assert keyset_filter(encode_cursor(id), descending=True) == {"_id": {"$lt": id}}
+
+
+def test_keyset_filter_breaks_ties_on_id():
+    id, created_at = ObjectId(), datetime(2024, 5, 1)
+    assert keyset_filter(encode_cursor(id, created_at), "created_at", descending=True) == {
+        "$or": [{"created_at": {"$lt": created_at}}, {"created_at": created_at, "_id": {"$lt": id}}]
+    }
+    assert keyset_sort("created_at", descending=True) == [("created_at", -1), ("_id", -1)]
+
+
+def test_next_cursor_resumes_after_document():
+    id, created_at = ObjectId(), datetime(2024, 5, 1, 8)
+    for doc in ({"_id": id, "created_at": created_at}, SimpleNamespace(id=id, created_at=created_at)):
+        assert decode_cursor(next_cursor_for(doc, "created_at")) == (id, created_at)
+        assert decode_cursor(next_cursor_for(doc)) == (id, None)
+
+
+def test_merge_filters():
+    assert merge_filters(None, {}) == {}
+    assert merge_filters({"a": 1}, None) == {"a": 1}
+    assert merge_filters({"a": 1}, {"b": 2}) == {"$and": [{"a": 1}, {"b": 2}]}
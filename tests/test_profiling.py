@@ -0,0 +1,89 @@
+import asyncio
+
+import httpx
+from fastapi import FastAPI
+
+from service.profiling import ProfileStore, ProfilingMiddleware, profile_as_text
+
+
+def profiled_app(sample_rate: float = 0.0):
+    app = FastAPI()
+    store = ProfileStore(5)
+    release = asyncio.Event()
+
+    async def is_admin(request) -> bool:
+        return request.headers.get("authorization") == "admin"
+
+    middleware = ProfilingMiddleware(store, sample_rate, "X-Profile", is_admin)
+    app.middleware("http")(middleware)
+
+    @app.get("/work")
+    async def work():
+        return {"total": sum(range(1000))}
+
+    @app.get("/wait")
+    async def wait():
+        await release.wait()
+        return {}
+
+    return app, store, middleware, release
+
+
+def client(app):
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+def test_admin_header_captures_a_profile():
+    async def scenario():
+        app, store, _, _ = profiled_app()
+        async with client(app) as http:
+            response = await http.get("/work", headers={"X-Profile": "1", "authorization": "admin"})
+            plain = await http.get("/work", headers={"X-Profile": "1"})
+        profile_id = int(response.headers["X-Profile-Id"])
+        assert "X-Profile-Id" not in plain.headers
+        assert [profile["id"] for profile in store.list()] == [profile_id]
+        assert store.list()[0]["overlapping_requests"] == 0
+        assert "function calls" in profile_as_text(store.get(profile_id))
+
+    asyncio.run(scenario())
+
+
+def test_ring_keeps_the_most_recent_profiles():
+    async def scenario():
+        app, store, _, _ = profiled_app(sample_rate=1.0)
+        async with client(app) as http:
+            for _ in range(7):
+                await http.get("/work")
+        assert [profile["id"] for profile in store.list()] == [7, 6, 5, 4, 3]
+
+    asyncio.run(scenario())
+
+
+def test_profiles_are_skipped_while_other_requests_are_in_flight():
+    async def scenario():
+        app, store, middleware, release = profiled_app()
+        async with client(app) as http:
+            waiting = asyncio.ensure_future(http.get("/wait"))
+            await asyncio.sleep(0.05)
+            response = await http.get("/work", headers={"X-Profile": "1", "authorization": "admin"})
+            release.set()
+            await waiting
+        assert response.headers["X-Profile-Skipped"] == "other requests in flight"
+        assert store.list() == []
+        assert middleware.skipped_busy == 1
+
+    asyncio.run(scenario())
+
+
+def test_requests_arriving_during_a_profile_are_counted():
+    async def scenario():
+        app, store, _, release = profiled_app()
+        async with client(app) as http:
+            profiled = asyncio.ensure_future(http.get("/wait", headers={"X-Profile": "1", "authorization": "admin"}))
+            await asyncio.sleep(0.05)
+            await http.get("/work")
+            release.set()
+            await profiled
+        assert store.list()[0]["overlapping_requests"] == 1
+
+    asyncio.run(scenario())
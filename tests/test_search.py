@@ -0,0 +1,65 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+
+from data.search import search_scopes
+from database.pagination import encode_cursor
+from service.search import InMemorySearch, decode_search_cursor, matches
+
+
+def comment(hobby_name, topic_name, text):
+    return {"_id": ObjectId(), "hobby_name": hobby_name, "topic_name": topic_name, "comment": text, "owner": "a@example.com"}
+
+
+def test_topic_scope_excludes_same_named_topics_in_other_hobbies():
+    async def scenario():
+        index = InMemorySearch()
+        mine, legacy, other = comment("climbing", "gear", "new rope"), comment(None, "gear", "old rope"), comment("sailing", "gear", "rope splice")
+        for doc in (mine, legacy, other):
+            index.add("comment", doc)
+        scopes = await search_scopes("climbing", "gear")
+        page = await index.search("rope", {"comment": scopes["comment"]}, None, 10)
+        assert {hit["_id"] for hit in page["items"]} == {mine["_id"], legacy["_id"]}
+        assert {hit["hobby_name"] for hit in page["items"]} == {"climbing", None}
+
+    asyncio.run(scenario())
+
+
+def test_search_pages_resume_after_cursor():
+    async def scenario():
+        index = InMemorySearch()
+        docs = [comment("climbing", "gear", "rope " * (i + 1)) for i in range(5)]
+        for doc in docs:
+            index.add("comment", doc)
+        seen, cursor = [], None
+        while True:
+            page = await index.search("rope", {"comment": {}}, cursor, 2)
+            seen.extend(hit["_id"] for hit in page["items"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        assert sorted(seen) == sorted(doc["_id"] for doc in docs)
+        assert len(seen) == len(set(seen))
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("cursor", [encode_cursor(ObjectId()), encode_cursor(ObjectId(), "text"), encode_cursor(ObjectId(), [1.0])])
+def test_foreign_cursor_is_a_bad_request(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_search_cursor(cursor)
+    assert error.value.status_code == 400
+
+
+def test_pending_deletions_hide_comments_written_before_the_delete():
+    deleted_at = datetime.now()
+    scope = {"$nor": [{"hobby_name": "climbing", "created_at": {"$lte": deleted_at}}]}
+    old = {**comment("climbing", "gear", "rope"), "created_at": deleted_at - timedelta(minutes=1)}
+    new = {**comment("climbing", "gear", "rope"), "created_at": deleted_at + timedelta(minutes=1)}
+    other = {**comment("sailing", "gear", "rope"), "created_at": deleted_at - timedelta(minutes=1)}
+    assert not matches(old, scope)
+    assert matches(new, scope)
+    assert matches(other, scope)
@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from service.singleflight import SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    async def scenario():
+        flight, calls = SingleFlight(), []
+
+        async def load():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {"name": "climbing"}
+
+        results = await asyncio.gather(*(flight.do("climbing", load) for _ in range(10)))
+        assert len(calls) == 1
+        assert all(result is results[0] for result in results)
+        assert flight.stats()["coalesced"] == 9
+        assert flight.stats()["in_flight"] == 0
+        await flight.do("climbing", load)
+        assert len(calls) == 2
+
+    asyncio.run(scenario())
+
+
+def test_errors_reach_every_waiter_and_are_not_cached():
+    async def scenario():
+        flight, calls = SingleFlight(), []
+
+        async def fail():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            raise RuntimeError("database unavailable")
+
+        results = await asyncio.gather(*(flight.do("climbing", fail) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(result, RuntimeError) for result in results)
+        with pytest.raises(RuntimeError):
+            await flight.do("climbing", fail)
+        assert len(calls) == 2
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_leaves_the_flight_running():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def load():
+            await asyncio.sleep(0.01)
+            return "done"
+
+        first = asyncio.ensure_future(flight.do("climbing", load))
+        second = asyncio.ensure_future(flight.do("climbing", load))
+        await asyncio.sleep(0)
+        first.cancel()
+        assert await second == "done"
+
+    asyncio.run(scenario())
+
+
+def test_waiters_beyond_the_cap_are_rejected():
+    async def scenario():
+        flight = SingleFlight(max_waiters=2)
+
+        async def load():
+            await asyncio.sleep(0.01)
+            return "done"
+
+        results = await asyncio.gather(*(flight.do("climbing", load) for _ in range(3)), return_exceptions=True)
+        assert results[:2] == ["done", "done"]
+        assert isinstance(results[2], HTTPException) and results[2].status_code == 503
+        assert flight.stats()["rejected"] == 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,40 @@
+from service.trending import SlidingWindow
+
+
+def test_counts_expire_once_their_bucket_leaves_the_window():
+    window = SlidingWindow(window=60, bucket_seconds=10, max_keys=100)
+    window.add("climbing", 3, now=0)
+    window.add("sailing", 1, now=25)
+    window.add("climbing", 1, now=55)
+    assert window.top(2) == [("climbing", 4), ("sailing", 1)]
+    window.advance(now=65)
+    assert dict(window.totals) == {"climbing": 1, "sailing": 1}
+    window.advance(now=90)
+    assert window.top(2) == [("climbing", 1)]
+    window.advance(now=200)
+    assert window.top(2) == []
+
+
+def test_reused_slots_drop_their_old_counts():
+    window = SlidingWindow(window=30, bucket_seconds=10, max_keys=100)
+    window.add("climbing", 5, now=0)
+    window.add("sailing", 2, now=30)
+    assert dict(window.totals) == {"sailing": 2}
+
+
+def test_top_returns_the_k_largest():
+    window = SlidingWindow(window=60, bucket_seconds=10, max_keys=100)
+    for score, key in enumerate(["a", "b", "c", "d"], start=1):
+        window.add(key, score, now=0)
+    assert window.top(2) == [("d", 4), ("c", 3)]
+
+
+def test_new_keys_beyond_the_cap_are_dropped():
+    window = SlidingWindow(window=60, bucket_seconds=10, max_keys=2)
+    assert window.add("a", 1, now=0)
+    assert window.add("b", 1, now=0)
+    assert not window.add("c", 1, now=0)
+    assert window.add("a", 1, now=0)
+    assert window.add("c", 1, now=10)
+    assert window.dropped == 1
+    assert dict(window.totals) == {"a": 2, "b": 1, "c": 1}
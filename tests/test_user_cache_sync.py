@@ -0,0 +1,42 @@
+import asyncio
+
+from service.broker import InProcessBroker
+from service.cache import CacheSync, TTLCache
+from service.users import USERS_CHANNEL
+
+
+def test_invalidation_reaches_other_workers():
+    async def scenario():
+        broker = InProcessBroker()
+        local, remote = TTLCache(10, 60), TTLCache(10, 60)
+        local_sync, remote_sync = CacheSync(local, USERS_CHANNEL), CacheSync(remote, USERS_CHANNEL)
+        await local_sync.start(broker)
+        await remote_sync.start(broker)
+        await asyncio.sleep(0)
+        local.set("a@example.com", "stale")
+        remote.set("a@example.com", "stale")
+        remote.set("b@example.com", "fresh")
+
+        await local_sync.invalidate("a@example.com")
+        await asyncio.sleep(0)
+
+        assert local.get("a@example.com") is None
+        assert remote.get("a@example.com") is None
+        assert remote.get("b@example.com") == "fresh"
+        assert remote_sync.received == 1
+        await local_sync.stop()
+        await remote_sync.stop()
+
+    asyncio.run(scenario())
+
+
+def test_invalidate_without_broker_only_clears_local_cache():
+    async def scenario():
+        cache = TTLCache(10, 60)
+        cache.set("a@example.com", "stale")
+        sync = CacheSync(cache, USERS_CHANNEL)
+        await sync.invalidate("a@example.com")
+        assert cache.get("a@example.com") is None
+        assert sync.sent == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,47 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from data.users import edit_user
+from models.users import User
+from tests.mongo import fresh_database
+
+
+async def seed_users(*emails: str):
+    for email in emails:
+        await User(email=email, password="hashed").insert()
+
+
+def test_edit_user_changes_email_and_password():
+    async def scenario():
+        await fresh_database()
+        await seed_users("old@example.com")
+        result = await edit_user(User(email="new@example.com", password="secret"), "old@example.com")
+        assert result == {"message": "User profile updated successfully"}
+        assert await User.find_one(User.email == "old@example.com") is None
+        updated = await User.find_one(User.email == "new@example.com")
+        assert updated.password != "hashed"
+
+    asyncio.run(scenario())
+
+
+def test_edit_user_keeps_email_when_only_the_password_changes():
+    async def scenario():
+        await fresh_database()
+        await seed_users("a@example.com")
+        await edit_user(User(email="a@example.com", password="secret"), "a@example.com")
+        assert (await User.find_one(User.email == "a@example.com")).password != "hashed"
+
+    asyncio.run(scenario())
+
+
+def test_edit_user_rejects_an_email_owned_by_someone_else():
+    async def scenario():
+        await fresh_database()
+        await seed_users("a@example.com", "b@example.com")
+        with pytest.raises(HTTPException) as error:
+            await edit_user(User(email="b@example.com", password="secret"), "a@example.com")
+        assert error.value.status_code == 409
+
+    asyncio.run(scenario())